@@ -1,64 +1,133 @@
 import os
-import csv
+import time
+import queue
+import logging
+import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from collections import defaultdict
-
-# Helper functions
-def read_lif_file(filepath):
-    try:
-        with open(filepath, 'r', encoding="latin-1") as f:
-            lines = f.readlines()
-    except FileNotFoundError:
-        return []
-    return [line.strip() for line in lines if line.strip()]
-
-def assign_points_from_lif(lif_lines):
-    club_scores = defaultdict(int)
-    prev_place = None
-    prev_points = 0
-
-    def get_points(place):
-        try:
-            n = int(place)
-            return 9 - n if 1 <= n <= 8 else 1
-        except:
-            return 0
-
-    if not lif_lines or "Final" not in lif_lines[0]:
-        return club_scores
-
-    for line in lif_lines[1:]:
-        parts = line.split(",")
-        if len(parts) < 6:
-            continue
-
-        place = parts[0].strip()
-        assoc = parts[5].strip()
-        if not assoc or place.upper() in ("DQ", "DNS") or place == "":
-            continue
-
-        points = get_points(place)
-        if place == prev_place:
-            points = prev_points
+from contextlib import closing
+
+# Scoring lives in waka_scoring so it can run without Tk (see waka_cli.py)
+from waka_scoring import (
+    find_year_folders, plan_seasons, score_seasons, combine_scores, ranking_for, write_standings_csv,
+    write_contributions_csv, ScoreTotals, SeasonScores,
+    iter_folder_changes, rescore_file, CHANGE_LOG_HEADER, StageTimer, profiled, log, season_path,
+    load_season_stores, save_season_stores, load_folder_points_rules, set_points_rules
+)
+
+PROFILE_NAME = "waka_profile.pstats"
+
+class ScoreboardView:
+    # Treeview that only holds the rows on screen. The ranked rows stay in a Ranking
+    # and scrolling re-labels a fixed set of Treeview items, so a board with thousands of
+    # associations opens as fast as one with ten. on_open is called with the association
+    # of a row that is double-clicked or has Return pressed on it.
+    def __init__(self, parent, columns, height=15, on_open=None):
+        self.frame = tk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings",
+                                 height=height, selectmode="browse")
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.rows = []
+        self.first = 0
+        self.page = height
+        self.items = []
+        self.shown = []
+        self.selected = None
+        self.on_open = on_open
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<Double-1>", lambda e: self.open_row(self.tree.identify_row(e.y)))
+        self.tree.bind("<Return>", lambda e: self.open_row(self.tree.focus()))
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_to(self.first - 3 * (1 if e.delta > 0 else -1)))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_to(self.first - 3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_to(self.first + 3))
+        self.tree.bind("<Prior>", lambda e: self.scroll_to(self.first - self.page))
+        self.tree.bind("<Next>", lambda e: self.scroll_to(self.first + self.page))
+        self.tree.bind("<Home>", lambda e: self.scroll_to(0))
+        self.tree.bind("<End>", lambda e: self.scroll_to(len(self.rows)))
+
+    def set_rows(self, rows):
+        # rows is a Ranking (or list of rows); only the visible slice reaches the Treeview
+        self.rows = rows
+        self.scroll_to(self.first)
+
+    def scroll_to(self, first):
+        self.first = max(0, min(first, len(self.rows) - self.page))
+        self.render()
+        return "break"
+
+    def render(self):
+        window = self.rows[self.first:self.first + self.page]
+        while len(self.items) < len(window):
+            self.items.append(self.tree.insert("", "end"))
+            self.shown.append(None)
+        while len(self.items) > len(window):
+            self.tree.delete(self.items.pop())
+            self.shown.pop()
+
+        # Only rows whose text changed are touched
+        selection = ()
+        for i, values in enumerate(window):
+            if self.shown[i] != values:
+                self.tree.item(self.items[i], values=values)
+                self.shown[i] = values
+            if self.selected is not None and values[1] == self.selected:
+                selection = (self.items[i],)
+        if tuple(self.tree.selection()) != selection:
+            self.tree.selection_set(selection)
+
+        total = len(self.rows)
+        if total:
+            self.scrollbar.set(self.first / total, (self.first + len(window)) / total)
         else:
-            prev_place = place
-            prev_points = points
+            self.scrollbar.set(0, 1)
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.rows)))
+        elif action == "scroll":
+            step = self.page if unit == "pages" else 1
+            self.scroll_to(self.first + int(amount) * step)
+
+    def on_resize(self, event):
+        # Fit the page to the rows that actually fit once the first row has a size
+        bbox = self.tree.bbox(self.items[0]) if self.items else None
+        if not bbox:
+            return
+        page = max(1, (event.height - bbox[1]) // bbox[3])
+        if page != self.page:
+            self.page = page
+            self.scroll_to(self.first)
 
-        assocs = [a.strip() for a in assoc.split("&")]
-        for a in assocs:
-            club_scores[a] += points
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection and selection[0] in self.items:
+            self.selected = self.shown[self.items.index(selection[0])][1]
 
-    return club_scores
+    def open_row(self, item):
+        if self.on_open and item in self.items:
+            self.on_open(self.shown[self.items.index(item)][1])
 
 class WakaAmaApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Waka Ama Games")
-        self.geometry("550x300")
+        self.geometry("550x340")
         self.configure(bg="#e6f7ff")
-        self.total_scores = defaultdict(int)
+        self.total_scores = ScoreTotals()
+        self.seasons = {}
+        self.year_folders = {}
         self.parent_folder = ""
+        self.worker = None
+        self.workers = tk.IntVar(value=1)
+        self.use_cache = tk.BooleanVar(value=True)
+        self.profile = tk.BooleanVar(value=False)
+        self.compile = tk.BooleanVar(value=False)
+        self.in_flight = tk.IntVar(value=0)
+        self.timer = StageTimer()
         self.show_interface()
 
     def clear_screen(self):
@@ -69,6 +138,11 @@ class WakaAmaApp(tk.Tk):
         folder = filedialog.askdirectory(title="Choose Folder")
         if folder:
             self.parent_folder = folder
+            try:
+                load_folder_points_rules(folder)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                set_points_rules(None)
+                messagebox.showerror("Points Rules", f"points_rules.json could not be read, using the default rules:\n{e}")
             messagebox.showinfo("Folder Selected", f"Chosen folder:\n{folder}")
 
     def process_year(self, event=None):
@@ -80,29 +154,55 @@ class WakaAmaApp(tk.Tk):
             messagebox.showwarning("No Folder Selected", "Please select a folder first.")
             return
 
-        folder = os.path.join(self.parent_folder, f"WakaNats{year}")
-        if not os.path.exists(folder):
+        # The season folder, or WakaNats{year}.zip / .tar.gz if it has been archived
+        folder = season_path(self.parent_folder, year)
+        if folder is None:
+            folder = os.path.join(self.parent_folder, f"WakaNats{year}")
             messagebox.showerror("Folder Not Found", f"Folder '{folder}' was not found")
             return
 
-        files = [f for f in os.listdir(folder) if f.lower().endswith(".lif")]
-        if not files:
-            messagebox.showinfo("No Files Found", f"No .lif files found in {folder}.")
+        def on_done(seasons):
+            self.seasons = seasons
+            self.year_folders = {int(year): folder}
+            self.total_scores = seasons[int(year)].total_scores
+            self.show_scoreboard(year)
+
+        self.start_processing(year, f"Year being processed: {year}", {int(year): folder}, on_done)
+
+    def process_all_years(self):
+        if not self.parent_folder:
+            messagebox.showwarning("No Folder Selected", "Please select a folder first.")
+            return
+
+        year_folders = find_year_folders(self.parent_folder)
+        if not year_folders:
+            messagebox.showerror("Folder Not Found", f"No WakaNats folders found in '{self.parent_folder}'")
             return
 
-        self.total_scores = defaultdict(int)
-        final_count = 0
-        total_files = len(files)
+        def on_done(seasons):
+            self.seasons = seasons
+            self.year_folders = year_folders
+            year_scores = {y: season.total_scores for y, season in seasons.items()}
+            self.total_scores = combine_scores(year_scores.values())
+            self.show_scoreboard("All Years", year_scores)
+
+        years = list(year_folders)
+        self.start_processing("All Years", f"Years being processed: {years[0]}–{years[-1]}", year_folders, on_done)
+
+    def start_processing(self, title, heading, year_folders, on_done):
+        if self.worker and self.worker.is_alive():
+            messagebox.showwarning("Busy", "A year is already being processed.")
+            return
 
         # Progress window
         progress_win = tk.Toplevel(self)
-        progress_win.title(f"Processing {year}")
+        progress_win.title(f"Processing {title}")
         progress_win.geometry("500x400")
         progress_win.configure(bg="#f0f9ff")
 
         tk.Label(
             progress_win,
-            text=f"Year being processed: {year}",
+            text=heading,
             font=("Arial", 14, "bold"),
             bg="#f0f9ff"
         ).pack(pady=10)
@@ -118,32 +218,125 @@ class WakaAmaApp(tk.Tk):
 
         summary_label = tk.Label(
             progress_win,
-            text=f"Total files: {total_files}\nFinal files: {final_count}",
+            text="Scanning folder...",
             font=("Arial", 12, "bold"),
             bg="#f0f9ff"
         )
         summary_label.pack(pady=10)
 
-        # Process each file
-        for i, f in enumerate(files, 1):
-            filepath = os.path.join(folder, f)
-            lif_lines = read_lif_file(filepath)
-
-            if lif_lines and "Final" in lif_lines[0]:
-                final_count += 1
-                file_scores = assign_points_from_lif(lif_lines)
-                for club, points in file_scores.items():
-                    self.total_scores[club] += points
-
-            # Update popup text
-            file_label.config(text=f"Processing file {i}/{total_files}: {f}")
-            summary_label.config(text=f"Total files: {total_files}\nFinal files: {final_count}")
-            progress_win.update_idletasks()
+        cancel_event = threading.Event()
+        cancel_btn = tk.Button(
+            progress_win, text="Cancel", font=("Arial", 12),
+            bg="#ffcccc", command=cancel_event.set
+        )
+        cancel_btn.pack(pady=10)
+        progress_win.protocol("WM_DELETE_WINDOW", cancel_event.set)
+
+        # Score the files on a worker thread, progress comes back through the queue
+        progress_queue = queue.Queue()
+        self.timer = StageTimer()
+        profile_path = os.path.join(self.parent_folder, PROFILE_NAME) if self.profile.get() else None
+        self.worker = threading.Thread(
+            target=self.score_worker,
+            args=(year_folders, self.workers.get(), self.use_cache.get(), progress_queue, cancel_event,
+                  self.timer, profile_path, self.compile.get(), self.in_flight.get()),
+            daemon=True
+        )
+        self.worker.start()
 
-        # Keep popup visible for 2 seconds after processing
-        progress_win.after(2000, lambda: [progress_win.destroy(), self.show_scoreboard(year)])
+        labels = (file_label, summary_label, cancel_btn)
+        self.poll_progress(title, progress_win, labels, progress_queue, on_done)
 
-    def show_scoreboard(self, year):
+    def score_worker(self, year_folders, workers, use_cache, progress_queue, cancel_event,
+                     timer=None, profile_path=None, compile_seasons=False, max_in_flight=0):
+        if timer is None:
+            timer = StageTimer()
+        merge_s = 0.0
+        try:
+            with profiled(profile_path):
+                # Seasons with an up-to-date compiled store are loaded from it. The
+                # store loads and the scan stop early once Cancel is pressed.
+                loaded, year_folders = load_season_stores(year_folders, timer, cancel_event)
+                seasons = {year: SeasonScores() for year in year_folders}
+                final_count = sum(len(season.file_scores) for season in loaded.values())
+
+                # Only the Finals listed in each season's manifest are opened
+                plan, total_files = plan_seasons(year_folders, timer, max_in_flight, cancel_event)
+                if cancel_event.is_set():
+                    progress_queue.put(("cancelled",))
+                    return
+                progress_queue.put(("scanned", total_files, sum(len(files) for _, _, files in plan), list(loaded)))
+                if not total_files and not loaded:
+                    return
+
+                with closing(score_seasons(plan, workers, use_cache, timer, max_in_flight)) as results:
+                    for i, (year, f, file_scores) in enumerate(results, 1):
+                        if cancel_event.is_set():
+                            progress_queue.put(("cancelled",))
+                            return
+                        if file_scores is not None:
+                            final_count += 1
+                            start = time.perf_counter()
+                            seasons[year].add_file(f, file_scores)
+                            merge_s += time.perf_counter() - start
+                        label = f if len(plan) == 1 else f"{year}: {f}"
+                        rate = i / timer.elapsed() if timer.elapsed() > 0 else 0.0
+                        progress_queue.put(("progress", i, label, final_count, rate))
+                start = time.perf_counter()
+                for season in seasons.values():
+                    season.flush()
+                merge_s += time.perf_counter() - start
+                timer.add("merge", merge_s, final_count)
+                save_season_stores(year_folders, seasons, compile_seasons)
+        except Exception as e:
+            progress_queue.put(("error", str(e)))
+            return
+        log.info("Scoring timings\n%s", timer.summary())
+        seasons.update(loaded)
+        progress_queue.put(("done", dict(sorted(seasons.items())), final_count))
+
+    def poll_progress(self, title, progress_win, labels, progress_queue, on_done, counts=(0, 0)):
+        file_label, summary_label, cancel_btn = labels
+        total_files, total_finals = counts
+        while True:
+            try:
+                msg = progress_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if msg[0] == "scanned":
+                _, total_files, total_finals, loaded = msg
+                counts = (total_files, total_finals)
+                if not total_files and not loaded:
+                    progress_win.destroy()
+                    messagebox.showinfo("No Files Found", f"No .lif files found for {title}.")
+                    return
+                if loaded:
+                    file_label.config(text="Loaded from compiled store: " + ", ".join(map(str, loaded)))
+                summary_label.config(text=f"Total files: {total_files}\nFinal files: 0")
+            elif msg[0] == "progress":
+                _, i, f, final_count, rate = msg
+                file_label.config(text=f"Processing final {i}/{total_finals}: {f}\n{rate:.0f} files/s")
+                summary_label.config(text=f"Total files: {total_files}\nFinal files: {final_count}")
+            elif msg[0] == "done":
+                _, seasons, final_count = msg
+                summary_label.config(text=f"Total files: {total_files}\nFinal files: {final_count}")
+                file_label.config(text=self.timer.summary(), font=("Courier", 10))
+                cancel_btn.config(state="disabled")
+                # Keep popup visible for 2 seconds after processing
+                progress_win.after(2000, lambda: [progress_win.destroy(), on_done(seasons)])
+                return
+            elif msg[0] == "cancelled":
+                progress_win.destroy()
+                return
+            elif msg[0] == "error":
+                progress_win.destroy()
+                messagebox.showerror("Processing Failed", msg[1])
+                return
+
+        self.after(50, self.poll_progress, title, progress_win, labels, progress_queue, on_done, counts)
+
+    def show_scoreboard(self, year, year_scores=None):
         popup = tk.Toplevel(self)
         popup.title(f"Ranking Calculator - {year}")
         popup.geometry("650x550")
@@ -157,32 +350,222 @@ class WakaAmaApp(tk.Tk):
             fg="#004080"
         ).pack(pady=15)
 
+        # Batch runs can switch between the all-time table and each season. The
+        # popup keeps the totals and seasons it was opened with, so a later run
+        # doesn't change what it switches back to.
+        total_scores = self.total_scores
+        seasons = self.seasons
+        shown = {"scores": total_scores, "seasons": seasons}
+        if year_scores:
+            choice = tk.StringVar(value="All-time")
+            selector = ttk.Combobox(
+                popup, textvariable=choice, state="readonly", font=("Arial", 12),
+                values=["All-time"] + [str(y) for y in year_scores]
+            )
+            selector.pack()
+
         columns = ("Rank", "Association", "Points")
-        tree = ttk.Treeview(popup, columns=columns, show="headings", height=15)
+        view = ScoreboardView(popup, columns,
+                              on_open=lambda club: self.show_breakdown(club, shown["scores"], shown["seasons"]))
         for col in columns:
-            tree.heading(col, text=col)
-            tree.column(col, anchor="center", width=180 if col != "Rank" else 70)
-        tree.pack(fill="both", expand=True, padx=15, pady=15)
-
-        sorted_scores = sorted(self.total_scores.items(), key=lambda x: x[1], reverse=True)
-        for rank, (club, points) in enumerate(sorted_scores, 1):
-            tree.insert("", "end", values=(rank, club, points))
+            view.tree.heading(col, text=col)
+            view.tree.column(col, anchor="center", width=180 if col != "Rank" else 70)
+        view.frame.pack(fill="both", expand=True, padx=15, pady=15)
+
+        def fill_tree(scores):
+            shown["scores"] = scores
+            with self.timer.stage("treeview"):
+                view.set_rows(ranking_for(scores))
+
+        fill_tree(total_scores)
+        log.info("Scoreboard timings\n%s", self.timer.summary())
+        if year_scores:
+            def on_select(event):
+                value = choice.get()
+                if value == "All-time":
+                    shown["seasons"] = seasons
+                    fill_tree(total_scores)
+                else:
+                    shown["seasons"] = {int(value): seasons[int(value)]}
+                    fill_tree(year_scores[int(value)])
+            selector.bind("<<ComboboxSelected>>", on_select)
 
         btn_frame = tk.Frame(popup, bg="#f9f9f9")
         btn_frame.pack(pady=10)
+        status_label = tk.Label(popup, text="", font=("Arial", 10), bg="#f9f9f9")
+        status_label.pack()
 
         tk.Button(
             btn_frame, text="Export to CSV", font=("Arial", 12),
-            bg="#99ddff", command=self.export_csv
+            bg="#99ddff", command=lambda: self.export_csv(shown["scores"], status=status_label)
+        ).pack(side="left", padx=10)
+
+        tk.Button(
+            btn_frame, text="Export with races", font=("Arial", 12), bg="#99ddff",
+            command=lambda: self.export_csv(shown["scores"], shown["seasons"], status_label)
         ).pack(side="left", padx=10)
 
+        # A single season can follow its folder while results come in (not an
+        # archive, or a season left with only its compiled store). The folder and
+        # season are taken now, as a later run replaces self.year_folders.
+        if not year_scores and os.path.isdir(self.year_folders[int(year)]):
+            folder = self.year_folders[int(year)]
+            season = seasons[int(year)]
+            watching = tk.BooleanVar(value=False)
+            # inotify never fires for changes on an SMB/NFS share, so those are polled
+            polling = tk.BooleanVar(value=False)
+            stop_event = threading.Event()
+
+            def toggle_watch():
+                nonlocal stop_event
+                stop_event.set()
+                if watching.get():
+                    stop_event = threading.Event()
+                    self.start_watch(folder, season, popup, view, stop_event, not polling.get())
+
+            tk.Checkbutton(
+                btn_frame, text="Watch folder", variable=watching, font=("Arial", 12),
+                bg="#f9f9f9", command=toggle_watch
+            ).pack(side="left", padx=10)
+            tk.Checkbutton(
+                btn_frame, text="Poll (network share)", variable=polling, font=("Arial", 12),
+                bg="#f9f9f9", command=toggle_watch
+            ).pack(side="left", padx=10)
+            popup.bind("<Destroy>", lambda e: stop_event.set() if e.widget is popup else None)
+
+            tk.Button(
+                btn_frame, text="Re-score file", font=("Arial", 12), bg="#99ddff",
+                command=lambda: self.rescore_amended(folder, season, popup, view)
+            ).pack(side="left", padx=10)
+
         tk.Button(
             btn_frame, text="Return", font=("Arial", 12),
             bg="#ffcccc", command=popup.destroy
         ).pack(side="left", padx=10)
 
-    def export_csv(self):
-        if not self.total_scores:
+    def show_breakdown(self, club, scores, seasons):
+        # Races an association scored in, straight from the result index built
+        # while scoring, so no .lif file is read again
+        popup = tk.Toplevel(self)
+        popup.title(f"Breakdown - {club}")
+        popup.geometry("650x450")
+        popup.configure(bg="#f9f9f9")
+
+        tk.Label(
+            popup, text=club, font=("Arial", 16, "bold"), bg="#f9f9f9", fg="#004080"
+        ).pack(pady=(15, 0))
+        tk.Label(
+            popup, text=f"Total points: {scores.get(club, 0)}", font=("Arial", 12), bg="#f9f9f9"
+        ).pack(pady=5)
+
+        columns = ("Year", "Event", "Place", "Points", "File")
+        frame = tk.Frame(popup)
+        tree = ttk.Treeview(frame, columns=columns, show="headings")
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, anchor="center", width=200 if col in ("Event", "File") else 60)
+        scrollbar.pack(side="right", fill="y")
+        tree.pack(side="left", fill="both", expand=True)
+        frame.pack(fill="both", expand=True, padx=15, pady=10)
+
+        for year in sorted(seasons):
+            for row in seasons[year].results.club_results(club):
+                tree.insert("", "end", values=(year, row.event, row.place, row.points, row.file))
+
+        tk.Button(
+            popup, text="Return", font=("Arial", 12), bg="#ffcccc", command=popup.destroy
+        ).pack(pady=10)
+
+    def rescore_amended(self, folder, season, popup, view):
+        # One file re-exported after a protest: only its points are taken off and
+        # added back, then the associations that moved are listed
+        path = filedialog.askopenfilename(
+            parent=popup, title="Choose the amended .lif file", initialdir=folder,
+            filetypes=[("LIF files", "*.lif"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        if os.path.normcase(os.path.dirname(os.path.abspath(path))) != os.path.normcase(os.path.abspath(folder)):
+            messagebox.showerror("Re-score File", f"Choose a file in '{folder}'", parent=popup)
+            return
+
+        try:
+            with self.timer.stage("rescore"):
+                changes = rescore_file(season, folder, os.path.basename(path))
+        except OSError as e:
+            messagebox.showerror("Re-score File", str(e), parent=popup)
+            return
+        view.set_rows(season.total_scores.ranking())
+        self.show_change_log(os.path.basename(path), changes)
+
+    def show_change_log(self, name, changes):
+        popup = tk.Toplevel(self)
+        popup.title(f"Changes - {name}")
+        popup.geometry("650x400")
+        popup.configure(bg="#f9f9f9")
+
+        text = f"{len(changes)} associations moved" if changes else "No association moved"
+        tk.Label(popup, text=text, font=("Arial", 14, "bold"), bg="#f9f9f9", fg="#004080").pack(pady=15)
+
+        frame = tk.Frame(popup)
+        tree = ttk.Treeview(frame, columns=CHANGE_LOG_HEADER, show="headings")
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        for col in CHANGE_LOG_HEADER:
+            tree.heading(col, text=col)
+            tree.column(col, anchor="center", width=200 if col == "Association" else 90)
+        scrollbar.pack(side="right", fill="y")
+        tree.pack(side="left", fill="both", expand=True)
+        frame.pack(fill="both", expand=True, padx=15)
+
+        for row in changes:
+            tree.insert("", "end", values=tuple("–" if value is None else value for value in row))
+
+        tk.Button(
+            popup, text="Return", font=("Arial", 12), bg="#ffcccc", command=popup.destroy
+        ).pack(pady=10)
+
+    def start_watch(self, folder, season, popup, view, stop_event, use_inotify=True):
+        changes_queue = queue.Queue()
+
+        def watch_worker():
+            try:
+                for batch in iter_folder_changes(folder, stop_event, use_inotify=use_inotify):
+                    changes_queue.put(batch)
+            except Exception as e:
+                changes_queue.put(e)
+
+        threading.Thread(target=watch_worker, daemon=True).start()
+        self.poll_watch(season, popup, view, changes_queue, stop_event)
+
+    def poll_watch(self, season, popup, view, changes_queue, stop_event):
+        if stop_event.is_set() or not popup.winfo_exists():
+            return
+
+        changed = set()
+        while True:
+            try:
+                batch = changes_queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(batch, Exception):
+                messagebox.showerror("Watch Failed", str(batch))
+                return
+            for name, file_scores in batch:
+                changed |= season.set_file(name, file_scores)
+
+        if changed:
+            view.set_rows(season.total_scores.ranking())
+        self.after(500, self.poll_watch, season, popup, view, changes_queue, stop_event)
+
+    def export_csv(self, scores=None, seasons=None, status=None):
+        # With seasons the export has one row per association per race as well as
+        # its rank and points. The file is written on a worker thread.
+        if scores is None:
+            scores = self.total_scores
+        if not scores:
             messagebox.showwarning("Export Error", "No data to export. Process a year first.")
             return
 
@@ -194,16 +577,51 @@ class WakaAmaApp(tk.Tk):
         if not file_path:
             return
 
-        try:
-            with open(file_path, 'w', newline='', encoding="utf-8") as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(["Rank", "Association", "Points"])
-                sorted_scores = sorted(self.total_scores.items(), key=lambda x: x[1], reverse=True)
-                for rank, (club, points) in enumerate(sorted_scores, 1):
-                    writer.writerow([rank, club, points])
-            messagebox.showinfo("Export Successful", f"Standings exported to {file_path}")
-        except Exception as e:
-            messagebox.showerror("Export Failed", str(e))
+        export_queue = queue.Queue()
+
+        def export_worker():
+            start = time.perf_counter()
+            try:
+                with open(file_path, 'w', newline='', encoding="utf-8") as csvfile:
+                    if seasons is None:
+                        rows = write_standings_csv(csvfile, scores, export_queue.put)
+                    else:
+                        rows = write_contributions_csv(csvfile, seasons, scores, export_queue.put)
+            except Exception as e:
+                export_queue.put(e)
+                return
+            export_queue.put(("done", rows, time.perf_counter() - start))
+
+        threading.Thread(target=export_worker, daemon=True).start()
+        self.poll_export(file_path, status, export_queue)
+
+    def poll_export(self, file_path, status, export_queue):
+        while True:
+            try:
+                msg = export_queue.get_nowait()
+            except queue.Empty:
+                break
+            if status is not None and not status.winfo_exists():
+                status = None
+
+            if isinstance(msg, int):
+                if status is not None:
+                    status.config(text=f"Exporting... {msg} rows")
+            elif isinstance(msg, Exception):
+                if status is not None:
+                    status.config(text="")
+                messagebox.showerror("Export Failed", str(msg))
+                return
+            else:
+                _, rows, seconds = msg
+                self.timer.add("export", seconds)
+                log.info("Export timings\n%s", self.timer.summary())
+                if status is not None:
+                    status.config(text="")
+                messagebox.showinfo("Export Successful", f"{rows} rows exported to {file_path}")
+                return
+
+        self.after(100, self.poll_export, file_path, status, export_queue)
 
     def show_interface(self):
         self.clear_screen()
@@ -230,6 +648,28 @@ class WakaAmaApp(tk.Tk):
         self.year_entry.pack(side="left", padx=(5, 0))
         self.year_entry.bind("<Return>", self.process_year)
 
+        options_frame = tk.Frame(self, bg="#e6f7ff")
+        options_frame.pack(pady=5)
+        tk.Label(options_frame, text="Worker processes:", font=("Arial", 12), bg="#e6f7ff").pack(side="left")
+        tk.Spinbox(options_frame, from_=1, to=os.cpu_count() or 1, textvariable=self.workers,
+                   font=("Arial", 12), width=4, state="readonly").pack(side="left", padx=(5, 0))
+        tk.Checkbutton(options_frame, text="Reuse cached scores", variable=self.use_cache,
+                       font=("Arial", 12), bg="#e6f7ff").pack(side="left", padx=(15, 0))
+        tk.Checkbutton(options_frame, text="Profile run", variable=self.profile,
+                       font=("Arial", 12), bg="#e6f7ff").pack(side="left", padx=(15, 0))
+        # Reads in flight > 0 overlaps file reads, for results folders on a network share
+        store_frame = tk.Frame(self, bg="#e6f7ff")
+        store_frame.pack()
+        tk.Checkbutton(store_frame, text="Compile seasons into one file", variable=self.compile,
+                       font=("Arial", 12), bg="#e6f7ff").pack(side="left")
+        tk.Label(store_frame, text="Reads in flight:", font=("Arial", 12), bg="#e6f7ff").pack(side="left", padx=(15, 0))
+        tk.Spinbox(store_frame, from_=0, to=64, textvariable=self.in_flight,
+                   font=("Arial", 12), width=4, state="readonly").pack(side="left", padx=(5, 0))
+
+        tk.Button(self, text="Score All Years", font=("Arial", 12), width=20, bg="#99ddff",
+                  command=self.process_all_years).pack(pady=5)
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     app = WakaAmaApp()
     app.mainloop()
@@ -0,0 +1,68 @@
+# Times re-scoring a whole season against re-scoring one amended Final, the way a
+# protest result comes back, and checks both give the same totals.
+#
+#   python benchmarks/bench_amend.py --files 4000 --amend 20
+#   python benchmarks/bench_amend.py --corpus <parent folder> --year 2024
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from make_corpus import make_corpus
+from waka_scoring import score_year_folders, rescore_file, update_manifest, manifest_finals
+
+def swap_first_two(path):
+    # Swaps the associations of the top two crews, as a protest upheld on the line would
+    with open(path, encoding="latin-1", newline="") as f:
+        lines = f.read().split("\r\n")
+    first, second = lines[1].split(","), lines[2].split(",")
+    first[5], second[5] = second[5], first[5]
+    lines[1], lines[2] = ",".join(first), ",".join(second)
+    with open(path, 'w', encoding="latin-1", newline="") as f:
+        f.write("\r\n".join(lines))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark re-scoring one amended file")
+    parser.add_argument("--corpus", help="existing parent folder of WakaNats{year} folders (copied, not changed)")
+    parser.add_argument("--year", type=int, default=2024)
+    parser.add_argument("--files", type=int, default=4000, help=".lif files in the generated season")
+    parser.add_argument("--amend", type=int, default=20, help="Finals to amend one after another")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            folder = os.path.join(tmp, f"WakaNats{args.year}")
+            shutil.copytree(os.path.join(args.corpus, f"WakaNats{args.year}"), folder)
+        else:
+            folder = make_corpus(tmp, [args.year], args.files, seed=args.seed)[args.year]
+        season = score_year_folders({args.year: folder}, use_cache=False)[args.year]
+        finals = manifest_finals(update_manifest(folder))
+        amended = random.Random(args.seed).sample(finals, min(args.amend, len(finals)))
+
+        full_s = delta_s = 0.0
+        moved = 0
+        for name in amended:
+            swap_first_two(os.path.join(folder, name))
+            start = time.perf_counter()
+            moved += len(rescore_file(season, folder, name))
+            delta_s += time.perf_counter() - start
+
+            start = time.perf_counter()
+            expected = score_year_folders({args.year: folder}, use_cache=False)[args.year]
+            full_s += time.perf_counter() - start
+            if dict(season.total_scores.items()) != dict(expected.total_scores.items()):
+                sys.exit(f"Totals differ after amending {name}")
+
+        count = len(amended)
+        print(f"{len(finals)} finals, {count} amended, {moved / count:.1f} associations moved per file")
+        print(f"{'full season':<14} {full_s / count * 1000:>9.2f} ms per amendment")
+        print(f"{'one file':<14} {delta_s / count * 1000:>9.2f} ms per amendment {full_s / delta_s:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Times loading a season one file at a time against the asyncio loader, on a
+# stand-in file system that adds a fixed delay to every open, like an SMB/NFS share.
+#
+#   python benchmarks/bench_async.py --files 500 --latency 0.005 --in-flight 1,8,32
+#   python benchmarks/bench_async.py --corpus <parent folder> --year 2024
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from make_corpus import make_corpus
+from waka_scoring import (
+    read_lif_bytes, read_lif_header, score_lif_bytes, score_lif_files_async, iter_loaded,
+    race_type, SeasonScores
+)
+
+class SlowFS:
+    # Local files behind a fixed round trip per open. Safe to call from many
+    # threads at once, as a share would be.
+    def __init__(self, latency):
+        self.latency = latency
+
+    def read_bytes(self, path):
+        time.sleep(self.latency)
+        return read_lif_bytes(path)
+
+    def read_header(self, path):
+        time.sleep(self.latency)
+        return read_lif_header(path)
+
+def load_serial(folder, files, fs):
+    # What a run without max_in_flight does: find the Finals, then read them in turn
+    finals = [f for f in files if race_type(fs.read_header(os.path.join(folder, f))) == "Final"]
+    season = SeasonScores()
+    for f in finals:
+        file_scores = score_lif_bytes(fs.read_bytes(os.path.join(folder, f)))
+        if file_scores is not None:
+            season.set_file(f, file_scores)
+    return season
+
+def load_async(folder, files, fs, max_in_flight):
+    paths = [os.path.join(folder, f) for f in files]
+    finals = [
+        os.path.basename(path) for path, header in iter_loaded(paths, fs.read_header, max_in_flight)
+        if race_type(header) == "Final"
+    ]
+    season = SeasonScores()
+    for f, file_scores in score_lif_files_async(folder, finals, max_in_flight, read=fs.read_bytes):
+        if file_scores is not None:
+            season.set_file(f, file_scores)
+    return season
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark async loading on a high-latency file system")
+    parser.add_argument("--corpus", help="existing parent folder of WakaNats{year} folders")
+    parser.add_argument("--year", type=int, default=2024)
+    parser.add_argument("--files", type=int, default=500, help=".lif files in the generated season")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds added to every open")
+    parser.add_argument("--in-flight", default="1,4,16,64", help="comma separated read limits to try")
+    args = parser.parse_args()
+    fs = SlowFS(args.latency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            folder = os.path.join(args.corpus, f"WakaNats{args.year}")
+        else:
+            folder = make_corpus(tmp, [args.year], args.files)[args.year]
+        files = sorted(f for f in os.listdir(folder) if f.lower().endswith(".lif"))
+
+        start = time.perf_counter()
+        expected = dict(load_serial(folder, files, fs).total_scores.items())
+        serial_s = time.perf_counter() - start
+        print(f"{len(files)} files, {args.latency * 1000:.1f} ms per open")
+        print(f"{'serial':<14} {serial_s:>8.3f} s")
+
+        for limit in (int(n) for n in args.in_flight.split(",")):
+            start = time.perf_counter()
+            season = load_async(folder, files, fs, limit)
+            elapsed = time.perf_counter() - start
+            if dict(season.total_scores.items()) != expected:
+                sys.exit(f"Totals differ with {limit} reads in flight")
+            print(f"{f'{limit} in flight':<14} {elapsed:>8.3f} s {serial_s / elapsed:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# Simulated venue screens on the /events feed: opens many Server-Sent-Events
+# subscribers, amends Finals one after another the way protests come back, and
+# checks every subscriber receives every diff, byte for byte the same, and that
+# applying the diffs to the standings it started from gives the final standings.
+# Reports how long each diff takes to reach the last subscriber.
+#
+#   python benchmarks/bench_feed.py --clients 300 --updates 50
+#   python benchmarks/bench_feed.py --corpus <parent folder> --year 2024 --reconnect 20
+import os
+import sys
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from make_corpus import make_corpus
+from bench_amend import swap_first_two
+from waka_scoring import score_year_folders, rescore_file, update_manifest, manifest_finals, rank_scores
+from waka_server import start_server, standings_diff
+
+async def read_event(reader):
+    # (id, event, data) of the next frame; comments and retry lines are skipped
+    fields = {}
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("feed closed")
+        line = line.decode("utf-8").rstrip("\n")
+        if line:
+            key, _, value = line.partition(": ")
+            fields[key] = value
+        elif "data" in fields:
+            return int(fields["id"]), fields.get("event"), fields["data"]
+        else:
+            fields = {}
+
+async def subscribe(host, port, last_id=None):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = f"GET /events HTTP/1.0\r\nHost: {host}\r\n"
+    if last_id is not None:
+        request += f"Last-Event-ID: {last_id}\r\n"
+    writer.write((request + "\r\n").encode("utf-8"))
+    while await reader.readline() not in (b"\r\n", b""):
+        pass
+    return reader, writer
+
+async def subscriber(host, port, updates, received, reconnect_at=None):
+    reader, writer = await subscribe(host, port)
+    received["ready"] += 1
+    events = []
+    while len(events) < updates:
+        event_id, event, data = await read_event(reader)
+        if event != "standings":
+            raise RuntimeError(f"unexpected {event} event")
+        events.append((event_id, data, time.perf_counter()))
+        if len(events) == reconnect_at:
+            # Drop the connection and resume where it left off
+            writer.close()
+            reader, writer = await subscribe(host, port, event_id)
+    writer.close()
+    return events
+
+async def run_clients(host, port, clients, updates, reconnect, server, publish):
+    received = {"ready": 0}
+    tasks = [
+        asyncio.create_task(subscriber(host, port, updates, received, updates // 2 if i < reconnect else None))
+        for i in range(clients)
+    ]
+    while received["ready"] < clients or len(server.broadcaster.streams) < clients:
+        await asyncio.sleep(0.05)
+    sent = await asyncio.to_thread(publish)
+    return sent, await asyncio.gather(*tasks)
+
+def apply_diffs(rows, diffs):
+    standings = {club: (rank, points) for rank, club, points in rows}
+    for diff in diffs:
+        for club, rank, points in json.loads(diff)["changes"]:
+            if points is None:
+                standings.pop(club, None)
+            else:
+                standings[club] = (rank, points)
+    return sorted((rank, club, points) for club, (rank, points) in standings.items())
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many subscribers on the standings feed")
+    parser.add_argument("--corpus", help="existing parent folder of WakaNats{year} folders (copied, not changed)")
+    parser.add_argument("--year", type=int, default=2024)
+    parser.add_argument("--files", type=int, default=1000, help=".lif files in the generated season")
+    parser.add_argument("--clients", type=int, default=300, help="concurrent subscribers")
+    parser.add_argument("--updates", type=int, default=50, help="amended Finals to push")
+    parser.add_argument("--interval", type=float, default=0.02, help="seconds between amendments")
+    parser.add_argument("--reconnect", type=int, default=10,
+                        help="subscribers that drop halfway and resume with Last-Event-ID")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            folder = os.path.join(tmp, f"WakaNats{args.year}")
+            shutil.copytree(os.path.join(args.corpus, f"WakaNats{args.year}"), folder)
+        else:
+            folder = make_corpus(tmp, [args.year], args.files, seed=args.seed)[args.year]
+        season = score_year_folders({args.year: folder}, use_cache=False)[args.year]
+        start_rows = rank_scores(season.total_scores)
+        finals = manifest_finals(update_manifest(folder))
+        rng = random.Random(args.seed)
+
+        server = start_server({args.year: season}, ("127.0.0.1", 0))
+        host, port = server.server_address[:2]
+
+        def publish():
+            # Amends Finals until --updates diffs have gone out; returns their send times
+            sent = []
+            while len(sent) < args.updates:
+                name = rng.choice(finals)
+                swap_first_two(os.path.join(folder, name))
+                with server.lock:
+                    moved = {change[0] for change in rescore_file(season, folder, name)}
+                if moved:
+                    sent.append(time.perf_counter())
+                    server.publish(diff=standings_diff(args.year, season.total_scores, moved))
+                time.sleep(args.interval)
+            return sent
+
+        try:
+            sent, results = asyncio.run(run_clients(host, port, args.clients, args.updates,
+                                                    args.reconnect, server, publish))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    first = [(event_id, data) for event_id, data, _ in results[0]]
+    for events in results:
+        if [(event_id, data) for event_id, data, _ in events] != first:
+            sys.exit("Subscribers received different diffs")
+    if apply_diffs(start_rows, [data for _, data in first]) != sorted(rank_scores(season.total_scores)):
+        sys.exit("Diffs don't add up to the final standings")
+
+    fan_out = sorted(
+        max(events[i][2] for events in results) - sent[i] for i in range(args.updates)
+    )
+    size = sum(len(data) for _, data in first) / args.updates
+    print(f"{args.clients} subscribers ({args.reconnect} reconnecting), {args.updates} diffs "
+          f"of {size:.0f} bytes on average, all delivered and identical")
+    print(f"{'fan-out ms':>10} p50 {fan_out[len(fan_out) // 2] * 1000:.1f}"
+          f"  p99 {fan_out[int(len(fan_out) * 0.99)] * 1000:.1f}  max {fan_out[-1] * 1000:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# Compares the start-up cost of the headless CLI module with the Tk GUI module.
+#
+#   python benchmarks/bench_import.py [--repeat N]
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importing the GUI module and bringing up Tk; without a display only Tcl is loaded
+GUI_STARTUP = """
+import tkinter, WakaAmaGamesV10
+try:
+    tkinter.Tk().destroy()
+except tkinter.TclError:
+    tkinter.Tcl()
+"""
+
+def best_time(code, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI vs GUI import time")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    # The CLI path must not pull in tkinter at all
+    subprocess.run(
+        [sys.executable, "-c", "import sys, waka_cli; assert 'tkinter' not in sys.modules"],
+        cwd=ROOT, check=True
+    )
+
+    interpreter = best_time("pass", args.repeat)
+    cli = best_time("import waka_cli", args.repeat)
+    gui_import = best_time("import WakaAmaGamesV10", args.repeat)
+    gui = best_time(GUI_STARTUP, args.repeat)
+
+    print(f"interpreter start-up:   {interpreter * 1000:8.1f} ms")
+    print(f"CLI (import waka_cli):  {cli * 1000:8.1f} ms (+{(cli - interpreter) * 1000:.1f} ms)")
+    print(f"GUI module import:      {gui_import * 1000:8.1f} ms (+{(gui_import - interpreter) * 1000:.1f} ms)")
+    print(f"GUI import + Tk start:  {gui * 1000:8.1f} ms (+{(gui - interpreter) * 1000:.1f} ms)")
+    print(f"CLI start-up is {(gui - cli) * 1000:.1f} ms faster than the GUI path ({gui / cli:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# Checks that streaming aggregation (stream_season_totals) runs in bounded memory.
+# Writes a synthetic season of large Finals as a .tar, .zip or folder, scores a
+# small slice of it and the whole of it under tracemalloc, and fails if the
+# peak grows with the corpus or goes over a budget set by the number of
+# associations and the files in flight.
+#
+#   python benchmarks/bench_memory.py --gb 4
+#   python benchmarks/bench_memory.py --gb 1 --layout folder --in-flight 8
+#   python benchmarks/bench_memory.py --gb 0.5 --compare
+import io
+import os
+import sys
+import time
+import random
+import tarfile
+import zipfile
+import argparse
+import tempfile
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from make_corpus import make_clubs, race_rows
+from waka_scoring import (
+    stream_season_totals, score_year_folders, score_lif_bytes, AssociationRegistry
+)
+
+def make_bodies(count, rows, clubs, rng):
+    # Distinct .lif files to repeat through the corpus; one in three is a Heat
+    bodies = []
+    for i in range(count):
+        stage = "Heat 1" if i % 3 == 2 else "Final"
+        lines = [f"{i + 1},1,1,Open Mixed W6 500m {stage},,,,,,"] + race_rows(rng, clubs, rows)
+        bodies.append(("\r\n".join(lines) + "\r\n").encode("latin-1"))
+    return bodies
+
+def iter_members(bodies, target_bytes):
+    # (name, body) until target_bytes have been written
+    written = 0
+    n = 0
+    while written < target_bytes:
+        body = bodies[n % len(bodies)]
+        n += 1
+        written += len(body)
+        yield f"{n:07d}-1-01.lif", body
+
+def write_season(path, layout, members):
+    # Returns how many times each body went in, to work out the expected totals
+    used = Counter()
+    if layout == "tar":
+        with tarfile.open(path, "w") as tf:
+            for name, body in members:
+                info = tarfile.TarInfo(name)
+                info.size = len(body)
+                tf.addfile(info, io.BytesIO(body))
+                tf.members = []
+                used[body] += 1
+    elif layout == "zip":
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+            for name, body in members:
+                zf.writestr(name, body)
+                used[body] += 1
+    else:
+        os.makedirs(path)
+        for name, body in members:
+            with open(os.path.join(path, name), "wb") as f:
+                f.write(body)
+            used[body] += 1
+    return used
+
+def expected_totals(used):
+    # Scored with score_lif_bytes, the row-keeping path score_year_folders uses,
+    # rather than score_lif_totals, the streaming path being checked
+    totals = Counter()
+    for body, count in used.items():
+        scored = score_lif_bytes(body)
+        if scored is not None:
+            for name, points in zip(scored.names, scored.points):
+                totals[name] += points * count
+    return dict(totals)
+
+def traced_peak(func):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        result = func()
+        return result, tracemalloc.get_traced_memory()[1], time.perf_counter() - start
+    finally:
+        tracemalloc.stop()
+
+def corpus_size(path):
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path))
+    return os.path.getsize(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check streaming aggregation stays in bounded memory")
+    parser.add_argument("--gb", type=float, default=0.25, help="size of the full corpus in GB")
+    parser.add_argument("--layout", choices=["tar", "zip", "folder"], default="tar")
+    parser.add_argument("--rows", type=int, default=2000, help="crews per file")
+    parser.add_argument("--clubs", type=int, default=300, help="distinct associations")
+    parser.add_argument("--in-flight", type=int, default=0, help="files read at once (folders only)")
+    parser.add_argument("--compare", action="store_true",
+                        help="also trace score_year_folders on the small corpus, which keeps every row")
+    parser.add_argument("--dir", help="where to write the corpus (default: a temporary folder)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bodies = make_bodies(48, args.rows, make_clubs(args.clubs, rng), rng)
+    largest = max(len(body) for body in bodies)
+    suffix = {"tar": ".tar", "zip": ".zip", "folder": ""}[args.layout]
+    target = int(args.gb * 1024 ** 3)
+    # Holding the files in flight and their split lines, the totals and a fixed allowance
+    budget = (max(args.in_flight, 1) + 2) * largest * 4 + args.clubs * 2048 + 4 * 1024 ** 2
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        peaks = []
+        for label, size in (("small", target // 8), ("full", target)):
+            path = os.path.join(tmp, label, f"WakaNats2024{suffix}")
+            os.makedirs(os.path.dirname(path))
+            used = write_season(path, args.layout, iter_members(bodies, size))
+            files = sum(used.values())
+
+            totals, peak, elapsed = traced_peak(
+                lambda: stream_season_totals(path, args.in_flight, registry=AssociationRegistry())
+            )
+            if dict(totals.items()) != expected_totals(used):
+                sys.exit(f"Streamed totals are wrong for the {label} corpus")
+            peaks.append(peak)
+            print(f"{label:<6} {corpus_size(path) / 1024 ** 2:>9.1f} MB {files:>8} files "
+                  f"{files * args.rows:>11} rows  peak {peak / 1024 ** 2:>7.2f} MB  {elapsed:>7.1f} s")
+
+            if args.compare and label == "small":
+                _, full_peak, _ = traced_peak(lambda: score_year_folders({2024: path}, use_cache=False))
+                print(f"{'':<6} score_year_folders on the same corpus peaks at {full_peak / 1024 ** 2:.2f} MB")
+
+    print(f"budget {budget / 1024 ** 2:.2f} MB ({args.clubs} associations, largest file {largest / 1024:.0f} KB)")
+    if peaks[1] > budget:
+        sys.exit("Peak memory is over budget")
+    if peaks[1] > peaks[0] * 1.25 + 512 * 1024:
+        sys.exit("Peak memory grew with the corpus")
+    print("bounded: peak memory does not depend on corpus size")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Times the merge step on its own: folding already-scored Finals into a season's
+# totals, the part of a run left once reading and parsing are done. Compares
+# adding files one set_file at a time and the batched add_file/flush used while a
+# season is scored with two references: per-file dicts merged into dict totals
+# with a count per association, as seasons were kept before names were interned,
+# and a plain dict sum that keeps nothing per file, the floor. Result rows are
+# left out so only the totals are timed; --rows puts them back.
+#
+#   python benchmarks/bench_merge.py --files 4000
+#   python benchmarks/bench_merge.py --corpus <parent folder> --rows
+import os
+import sys
+import time
+import argparse
+import tempfile
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from make_corpus import make_corpus, parse_years
+from waka_scoring import (
+    find_year_folders, update_manifest, manifest_finals, read_lif_bytes, score_lif_bytes,
+    SeasonScores, AssociationRegistry, FileResult
+)
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def scored_finals(year_folders, rows):
+    scored = []
+    for folder in year_folders.values():
+        for name in manifest_finals(update_manifest(folder)):
+            file_scores = score_lif_bytes(read_lif_bytes(os.path.join(folder, name)))
+            if not rows:
+                file_scores = FileResult(file_scores.event, file_scores.names, file_scores.points, [])
+            scored.append((f"{folder}/{name}", file_scores))
+    return scored
+
+def merge_set_file(scored):
+    season = SeasonScores(AssociationRegistry())
+    for name, file_scores in scored:
+        season.set_file(name, file_scores)
+    return season
+
+def merge_batched(scored):
+    season = SeasonScores(AssociationRegistry())
+    for name, file_scores in scored:
+        season.add_file(name, file_scores)
+    season.flush()
+    return season
+
+def file_dicts(scored):
+    # Each file's points per association, as scoring returned them before interning
+    dicts = []
+    for name, file_scores in scored:
+        points = defaultdict(int)
+        for club, p in zip(file_scores.names, file_scores.points):
+            points[club] += p
+        dicts.append((name, points))
+    return dicts
+
+def merge_file_dicts(dicts):
+    file_points = {}
+    totals = defaultdict(int)
+    counts = defaultdict(int)
+    for name, points in dicts:
+        file_points[name] = points
+        for club, p in points.items():
+            totals[club] += p
+            counts[club] += 1
+    return totals
+
+def merge_dict(scored):
+    totals = {}
+    for name, file_scores in scored:
+        for club, points in zip(file_scores.names, file_scores.points):
+            totals[club] = totals.get(club, 0) + points
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark merging scored files into season totals")
+    parser.add_argument("--corpus", help="existing parent folder of WakaNats{year} folders")
+    parser.add_argument("--years", default="2024", help="years to generate, e.g. 2017-2024")
+    parser.add_argument("--files", type=int, default=4000, help=".lif files per generated year")
+    parser.add_argument("--rows", action="store_true", help="keep result rows, so ResultStore is timed too")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            year_folders = find_year_folders(args.corpus)
+        else:
+            year_folders = make_corpus(tmp, parse_years(args.years), args.files, seed=args.seed)
+        scored = scored_finals(year_folders, args.rows)
+
+    expected = merge_dict(scored)
+    for merge in (merge_set_file, merge_batched):
+        if dict(merge(scored).total_scores.items()) != expected:
+            sys.exit(f"{merge.__name__} gives different totals")
+    dicts = file_dicts(scored)
+    if dict(merge_file_dicts(dicts)) != expected:
+        sys.exit("merge_file_dicts gives different totals")
+
+    print(f"{len(scored)} finals, {sum(len(fs.names) for _, fs in scored)} association entries")
+    for label, merge, data in (("set_file", merge_set_file, scored), ("add_file", merge_batched, scored),
+                               ("file dicts", merge_file_dicts, dicts), ("dict sum", merge_dict, scored)):
+        print(f"{label:<10} {best_of(lambda: merge(data), args.repeat) * 1000:>9.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# Compares the text-mode .lif parser the scorer used to have with the bytes-level
+# one on the same Finals, checking that both give identical results before timing
+# them. The text-mode reader only lives here now, as the reference.
+#
+#   python benchmarks/bench_parse.py --files 4000 --years 2023-2024
+#   python benchmarks/bench_parse.py --corpus <parent folder> --repeat 7
+import os
+import sys
+import time
+import argparse
+import tempfile
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from make_corpus import make_corpus, parse_years
+from waka_scoring import (
+    read_header_line, read_lif_header, score_fields, result_row, event_name, find_year_folders,
+    read_lif_bytes, score_lif_bytes, score_lif_totals, FileResult
+)
+import waka_scoring
+
+# The text-mode reader: universal newlines, every line decoded and split in full
+
+def read_lif_file(filepath):
+    try:
+        with open(filepath, 'r', encoding="latin-1") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return []
+    return [line.strip() for line in lines if line.strip()]
+
+def iter_fields(rows):
+    # (place, association, parts) for each row with at least six columns
+    for line in rows:
+        parts = line.split(",")
+        if len(parts) >= 6:
+            yield parts[0].strip(), parts[5].strip(), parts
+
+def assign_points_from_lif(lif_lines):
+    club_scores = defaultdict(int)
+    if lif_lines and "Final" in lif_lines[0]:
+        table = waka_scoring.POINTS_RULES.table_for(lif_lines[0])
+        for club, points in zip(*score_fields(iter_fields(lif_lines[1:]), table=table)):
+            club_scores[club] += points
+    return club_scores
+
+def iter_lif_rows(f):
+    with f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+def score_lif_text(path):
+    # Streams the rows after reading the header, as score_lif_path did before
+    # the bytes parser
+    try:
+        f = open(path, 'r', encoding="latin-1")
+    except FileNotFoundError:
+        return None
+    header = read_header_line(f)
+    if "Final" not in header:
+        f.close()
+        return None
+    results = []
+    names, points = score_fields(iter_fields(iter_lif_rows(f)), results, result_row,
+                                 waka_scoring.POINTS_RULES.table_for(header))
+    return FileResult(event_name(header), names, points, results)
+
+def assign_points_from_bytes(data):
+    # assign_points_from_lif's result from the bytes-level parser
+    club_scores = defaultdict(int)
+    scored = score_lif_totals(data)
+    if scored is not None:
+        for club, points in zip(*scored):
+            club_scores[club] += points
+    return club_scores
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def final_paths(year_folders):
+    paths = [
+        os.path.join(folder, name)
+        for folder in year_folders.values()
+        for name in sorted(os.listdir(folder)) if name.lower().endswith(".lif")
+    ]
+    return [path for path in paths if "Final" in read_lif_header(path)]
+
+def file_result_tuple(file_result):
+    if file_result is None:
+        return None
+    return file_result.event, file_result.names, list(file_result.points), file_result.rows
+
+def check_same(paths):
+    for path in paths:
+        if assign_points_from_lif(read_lif_file(path)) != assign_points_from_bytes(read_lif_bytes(path)):
+            sys.exit(f"Points differ for {path}")
+        if file_result_tuple(score_lif_text(path)) != file_result_tuple(score_lif_bytes(read_lif_bytes(path))):
+            sys.exit(f"Result rows differ for {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bytes-level .lif parser")
+    parser.add_argument("--corpus", help="existing parent folder of WakaNats{year} folders")
+    parser.add_argument("--years", default="2024", help="years to generate, e.g. 2017-2024")
+    parser.add_argument("--files", type=int, default=4000, help=".lif files per generated year")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            year_folders = find_year_folders(args.corpus)
+        else:
+            year_folders = make_corpus(tmp, parse_years(args.years), args.files, seed=args.seed)
+        paths = final_paths(year_folders)
+        check_same(paths)
+        print(f"{len(paths)} finals, results identical")
+
+        pairs = {
+            "points": (
+                lambda: [assign_points_from_lif(read_lif_file(path)) for path in paths],
+                lambda: [assign_points_from_bytes(read_lif_bytes(path)) for path in paths]
+            ),
+            "result rows": (
+                lambda: [score_lif_text(path) for path in paths],
+                lambda: [score_lif_bytes(read_lif_bytes(path)) for path in paths]
+            ),
+        }
+        print(f"{'':<12} {'text s':>9} {'bytes s':>9} {'speedup':>8}")
+        for name, (text, raw) in pairs.items():
+            text_s = best_of(text, args.repeat)
+            bytes_s = best_of(raw, args.repeat)
+            print(f"{name:<12} {text_s:>9.4f} {bytes_s:>9.4f} {text_s / bytes_s:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
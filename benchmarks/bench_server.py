@@ -0,0 +1,115 @@
+# Load test for the standings server: hundreds of simulated screens and phones
+# polling it at once, most of them with the ETag they were last given. Reports
+# requests per second, how many were answered 304 and the latency spread.
+#
+#   python benchmarks/bench_server.py --clients 200 --seconds 10
+#   python benchmarks/bench_server.py --corpus <parent folder> --years 2023-2024
+#   python benchmarks/bench_server.py --url http://venue-pc:8000 --clients 300
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from urllib.parse import urlsplit, quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from make_corpus import make_corpus, parse_years
+from waka_scoring import find_year_folders, score_year_folders
+from waka_server import start_server
+
+async def get(host, port, path, etag=None):
+    # One HTTP/1.0 GET; returns (status, etag)
+    reader, writer = await asyncio.open_connection(host, port)
+    request = f"GET {path} HTTP/1.0\r\nHost: {host}\r\n"
+    if etag:
+        request += f"If-None-Match: {etag}\r\n"
+    writer.write((request + "\r\n").encode("utf-8"))
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head = data.split(b"\r\n\r\n", 1)[0].decode("latin-1").split("\r\n")
+    status = int(head[0].split()[1])
+    headers = dict(line.split(": ", 1) for line in head[1:] if ": " in line)
+    return status, headers.get("ETag")
+
+async def client(host, port, paths, deadline, conditional, stats, rng):
+    etags = {}
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)
+        start = time.perf_counter()
+        try:
+            status, etag = await get(host, port, path, etags.get(path) if rng.random() < conditional else None)
+        except OSError:
+            stats["errors"] += 1
+            continue
+        stats["latency"].append(time.perf_counter() - start)
+        stats[status] = stats.get(status, 0) + 1
+        if etag:
+            etags[path] = etag
+
+async def run_clients(host, port, paths, clients, seconds, conditional, seed):
+    stats = {"latency": [], "errors": 0}
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(
+        client(host, port, paths, deadline, conditional, stats, random.Random(seed + i)) for i in range(clients)
+    ))
+    return stats
+
+def resource_paths(seasons, clubs=20):
+    paths = ["/years", "/standings"] + [f"/standings/{year}" for year in seasons]
+    names = sorted({club for season in seasons.values() for club in season.total_scores})
+    return paths + [f"/clubs/{quote(club)}" for club in names[:clubs]]
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the standings server")
+    parser.add_argument("--url", help="test a running server instead of starting one")
+    parser.add_argument("--corpus", help="existing parent folder of WakaNats{year} folders")
+    parser.add_argument("--years", default="2023-2024", help="years to generate, e.g. 2017-2024")
+    parser.add_argument("--files", type=int, default=1000, help=".lif files per generated year")
+    parser.add_argument("--clients", type=int, default=200, help="concurrent clients")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--threads", type=int, default=32, help="server request threads")
+    parser.add_argument("--conditional", type=float, default=0.9,
+                        help="share of requests that send If-None-Match")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    server = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+            paths = ["/years", "/standings"]
+        else:
+            if args.corpus:
+                year_folders = find_year_folders(args.corpus)
+            else:
+                year_folders = make_corpus(tmp, parse_years(args.years), args.files, seed=args.seed)
+            seasons = score_year_folders(year_folders, use_cache=False)
+            server = start_server(seasons, ("127.0.0.1", 0), args.threads)
+            host, port = server.server_address[:2]
+            paths = resource_paths(seasons)
+
+        try:
+            stats = asyncio.run(run_clients(host, port, paths, args.clients, args.seconds,
+                                            args.conditional, args.seed))
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+    latency = sorted(stats["latency"])
+    if not latency:
+        sys.exit("No request completed")
+    total = len(latency)
+    print(f"{args.clients} clients, {args.seconds:.0f} s, {len(paths)} resources")
+    print(f"{total / args.seconds:>10.0f} requests/s ({total} requests, {stats['errors']} errors)")
+    print(f"{stats.get(200, 0):>10} 200 OK, {stats.get(304, 0)} 304 Not Modified, {stats.get(404, 0)} 404")
+    print(f"{'latency ms':>10} p50 {latency[total // 2] * 1000:.1f}  p99 {latency[int(total * 0.99)] * 1000:.1f}"
+          f"  max {latency[-1] * 1000:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# Times each scoring stage on its own and saves the results as JSON, so runs
+# (and versions) can be compared against a stored baseline.
+#
+#   python benchmarks/bench_suite.py --files 2000 --years 2023-2024 -o results.json
+#   python benchmarks/bench_suite.py --corpus <parent folder> --baseline baseline.json
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from make_corpus import make_corpus, parse_years
+from waka_scoring import (
+    read_lif_bytes, split_lif_bytes, score_lif_bytes, score_lif_path, find_year_folders, score_year_folders, combine_scores, write_standings_csv,
+    SeasonScores
+)
+
+# 2: read_lif_file and assign_points_from_lif time the current reader and scorer
+RESULTS_VERSION = 2
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def lif_paths(year_folders):
+    return [
+        os.path.join(folder, name)
+        for folder in year_folders.values()
+        for name in sorted(os.listdir(folder)) if name.lower().endswith(".lif")
+    ]
+
+def run_suite(year_folders, repeat):
+    paths = lif_paths(year_folders)
+    data = [read_lif_bytes(path) for path in paths]
+    finals = [(path, d) for path, d in zip(paths, data) if "Final" in split_lif_bytes(d)[0]]
+    results = [(path, score_lif_bytes(d)) for path, d in finals]
+
+    def aggregate():
+        season = SeasonScores()
+        for path, file_result in results:
+            season.add_file(path, file_result)
+        season.flush()
+
+    seasons = score_year_folders(year_folders, use_cache=False)
+    combined = combine_scores(season.total_scores for season in seasons.values())
+
+    def export():
+        with tempfile.TemporaryFile('w+', newline='', encoding="utf-8") as csvfile:
+            write_standings_csv(csvfile, combined)
+
+    stages = {
+        # Whole-file read of every .lif, then scoring the Finals' bytes, with the
+        # reader and scorer scoring uses today (the original text-mode versions
+        # are compared in bench_parse.py)
+        "read_lif_file": (lambda: [read_lif_bytes(path) for path in paths], len(paths)),
+        "assign_points_from_lif": (lambda: [score_lif_bytes(d) for path, d in finals], len(finals)),
+        # Read and score of the Finals only, keeping every result row
+        "score_lif_path": (lambda: [score_lif_path(path) for path, d in finals], len(finals)),
+        "aggregate": (aggregate, len(results)),
+        "score_year_folders": (lambda: score_year_folders(year_folders, use_cache=False), len(paths)),
+        "export_csv": (export, len(combined)),
+    }
+    timings = {}
+    for name, (func, items) in stages.items():
+        seconds = best_of(func, repeat)
+        timings[name] = {
+            "best_s": seconds,
+            "items": items,
+            "per_item_us": seconds / items * 1e6 if items else 0.0
+        }
+    corpus = {"years": sorted(year_folders), "files": len(paths), "finals": len(finals), "associations": len(combined)}
+    return corpus, timings
+
+def compare(timings, baseline, tolerance):
+    # Prints each stage against the baseline and returns the stages that got slower
+    slower = []
+    print(f"{'stage':<24} {'baseline s':>11} {'this run s':>11} {'change':>8}")
+    for name, timing in timings.items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            print(f"{name:<24} {'-':>11} {timing['best_s']:>11.4f}")
+            continue
+        ratio = timing["best_s"] / base["best_s"] if base["best_s"] else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  slower"
+            slower.append(name)
+        elif ratio < 1 - tolerance:
+            flag = "  faster"
+        print(f"{name:<24} {base['best_s']:>11.4f} {timing['best_s']:>11.4f} {(ratio - 1) * 100:>+7.1f}%{flag}")
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scoring stages")
+    parser.add_argument("--corpus", help="existing parent folder of WakaNats{year} folders")
+    parser.add_argument("--years", default="2024", help="years to generate, e.g. 2017-2024")
+    parser.add_argument("--files", type=int, default=2000, help=".lif files per generated year")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a results JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before flagging")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            year_folders = find_year_folders(args.corpus)
+        else:
+            year_folders = make_corpus(tmp, parse_years(args.years), args.files, seed=args.seed)
+        corpus, timings = run_suite(year_folders, args.repeat)
+
+    results = {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": corpus,
+        "stages": timings
+    }
+
+    print(f"{corpus['files']} files, {corpus['finals']} finals, {corpus['associations']} associations")
+    slower = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("version") != RESULTS_VERSION:
+            print(f"Baseline is results version {baseline.get('version')}, not {RESULTS_VERSION}; "
+                  f"some stages time different code")
+        slower = compare(timings, baseline, args.tolerance)
+    else:
+        for name, timing in timings.items():
+            print(f"{name:<24} {timing['best_s']:>9.4f} s {timing['per_item_us']:>9.1f} us/item")
+
+    if args.output:
+        with open(args.output, 'w', encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if slower and args.fail_on_regression:
+        sys.exit(f"Slower than baseline: {', '.join(slower)}")
+
+if __name__ == "__main__":
+    main()
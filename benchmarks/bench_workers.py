@@ -0,0 +1,55 @@
+# Times scoring of one WakaNats{year} folder with 1..N worker processes.
+#
+#   python benchmarks/bench_workers.py <parent folder> <year> [--max-workers N] [--repeat R]
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from waka_scoring import score_lif_files, SeasonScores
+
+def score_year(folder, files, workers):
+    season = SeasonScores()
+    final_count = 0
+    for f, file_scores in score_lif_files(folder, files, workers):
+        if file_scores is not None:
+            final_count += 1
+            season.set_file(f, file_scores)
+    return season.total_scores, final_count
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark process pool scoring")
+    parser.add_argument("parent_folder")
+    parser.add_argument("year")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    folder = os.path.join(args.parent_folder, f"WakaNats{args.year}")
+    files = [f for f in os.listdir(folder) if f.lower().endswith(".lif")]
+    print(f"{folder}: {len(files)} .lif files, {os.cpu_count()} CPUs")
+
+    baseline = None
+    serial_time = None
+    print(f"{'workers':>8} {'best s':>10} {'files/s':>10} {'speedup':>8}")
+    for workers in range(1, args.max_workers + 1):
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            scores, final_count = score_year(folder, files, workers)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        # Merged totals (including their order) must match the serial run exactly
+        if baseline is None:
+            baseline = (list(scores.items()), final_count)
+            serial_time = best
+        elif (list(scores.items()), final_count) != baseline:
+            sys.exit(f"Totals with {workers} workers differ from the serial run")
+
+        print(f"{workers:>8} {best:>10.3f} {len(files) / best:>10.0f} {serial_time / best:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Builds synthetic WakaNats{year} folders of .lif files for benchmarking.
+#
+#   python benchmarks/make_corpus.py <output folder> --years 2017-2024 --files 2000
+#
+# Each season gets a mix of Heats, Semis and Finals. Rows include ties,
+# DQ/DNS entries and composite crews from several associations ("A & B").
+import os
+import random
+import argparse
+
+DIVISIONS = ["J16", "J19", "Open", "Masters", "Golden Masters", "Premier", "Intermediate"]
+GENDERS = ["Women", "Men", "Mixed"]
+CRAFT = ["W1", "W6", "W12", "V1"]
+DISTANCES = ["250m", "500m", "1000m", "1500m"]
+
+def make_clubs(count, rng):
+    stems = ["Awa", "Moana", "Kaha", "Tai", "Hoe", "Ngaru", "Roto", "Whetu", "Manu", "Rangi"]
+    return [f"{rng.choice(stems)} {rng.choice(stems)} Waka Ama {i}" for i in range(count)]
+
+def race_rows(rng, clubs, crews):
+    rows = []
+    place = 0
+    for lane in range(1, crews + 1):
+        roll = rng.random()
+        if roll < 0.04:
+            place_text = "DQ"
+        elif roll < 0.08:
+            place_text = "DNS"
+        else:
+            # Roughly one in ten finishers ties the crew ahead
+            if place and rng.random() < 0.1:
+                place_text = str(place)
+            else:
+                place += 1
+                place_text = str(place)
+        assoc = rng.choice(clubs)
+        if rng.random() < 0.08:
+            assoc = f"{assoc} & {rng.choice(clubs)}"
+        seconds = 120 + lane * 1.7 + rng.random() * 5
+        time_text = f"{int(seconds // 60)}:{seconds % 60:05.2f}" if place_text.isdigit() else ""
+        rows.append(f"{place_text},{1000 + lane},{lane},Crew {lane},{rng.choice(DIVISIONS)},{assoc},{time_text},,")
+    # Finishers first, DQ/DNS at the bottom like the timing system writes them
+    rows.sort(key=lambda row: not row.split(",")[0].isdigit())
+    return rows
+
+def make_season(folder, files, final_ratio, clubs, rng):
+    os.makedirs(folder, exist_ok=True)
+    for event in range(1, files + 1):
+        roll = rng.random()
+        if roll < final_ratio:
+            stage = "Final"
+        elif roll < final_ratio + (1 - final_ratio) / 3:
+            stage = "Semi"
+        else:
+            stage = f"Heat {rng.randint(1, 6)}"
+        name = (f"{rng.choice(DIVISIONS)} {rng.choice(GENDERS)} {rng.choice(CRAFT)} "
+                f"{rng.choice(DISTANCES)} {stage}")
+        lines = [f"{event},1,1,{name},,,,,,"]
+        lines += race_rows(rng, clubs, rng.randint(4, 12))
+        with open(os.path.join(folder, f"{event:04d}-1-01.lif"), 'w', encoding="latin-1", newline="\r\n") as f:
+            f.write("\n".join(lines) + "\n")
+
+def make_corpus(parent_folder, years, files_per_year, final_ratio=0.35, clubs=120, seed=1):
+    # Returns {year: folder} for the generated seasons
+    rng = random.Random(seed)
+    club_names = make_clubs(clubs, rng)
+    year_folders = {}
+    for year in years:
+        folder = os.path.join(parent_folder, f"WakaNats{year}")
+        make_season(folder, files_per_year, final_ratio, club_names, rng)
+        year_folders[year] = folder
+    return year_folders
+
+def parse_years(text):
+    if "-" in text:
+        first, last = text.split("-")
+        return list(range(int(first), int(last) + 1))
+    return [int(year) for year in text.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic .lif corpus")
+    parser.add_argument("output_folder")
+    parser.add_argument("--years", default="2024", help="e.g. 2024, 2017-2024 or 2019,2021")
+    parser.add_argument("--files", type=int, default=2000, help=".lif files per year")
+    parser.add_argument("--final-ratio", type=float, default=0.35)
+    parser.add_argument("--clubs", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    year_folders = make_corpus(args.output_folder, parse_years(args.years), args.files,
+                               args.final_ratio, args.clubs, args.seed)
+    print(f"Wrote {len(year_folders)} seasons of {args.files} files to {args.output_folder}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# SeasonScores.amend_file against brute force: after each random re-export,
+# removal or new file, the change log must list exactly the associations whose
+# rank or points differ between the full tables before and after, and the totals
+# must equal adding up every file still in the season.
+#
+#   python -m pytest tests/test_amend.py
+import os
+import sys
+import random
+from array import array
+from collections import Counter
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from waka_scoring import SeasonScores, AssociationRegistry, FileResult
+
+CLUBS = [f"Club {i}" for i in range(25)]
+
+def random_file(rng, event):
+    # A FileResult whose result rows agree with its (names, points)
+    rows = []
+    names = []
+    points = array('i')
+    for place in range(1, rng.randint(1, 8) + 1):
+        crew = rng.sample(CLUBS + ["New Club"], rng.randint(1, 2))
+        row_points = rng.choice([None, rng.randint(0, 8)])
+        rows.append((str(place), str(place), "Paddler", " & ".join(crew), "", row_points))
+        if row_points is not None:
+            names.extend(crew)
+            points.extend([row_points] * len(crew))
+    return FileResult(event, names, points, rows)
+
+def table(season):
+    return {club: (rank, points) for rank, club, points in season.total_scores.ranking()}
+
+def brute_log(before, after):
+    log = [
+        (club, *zip(before.get(club, (None, None)), after.get(club, (None, None))))
+        for club in set(before) | set(after) if before.get(club) != after.get(club)
+    ]
+    log = [(club, ranks[0], ranks[1], points[0], points[1]) for club, ranks, points in log]
+    return sorted(log, key=lambda row: (row[2] is None, row[2] or 0, row[0]))
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_change_log_matches_brute_force(seed):
+    rng = random.Random(seed)
+    season = SeasonScores(AssociationRegistry())
+    files = {}
+    for n in range(30):
+        name = f"{n:03d}-1-01.lif"
+        files[name] = random_file(rng, f"Final {n}")
+        season.add_file(name, files[name])
+    season.flush()
+
+    for step in range(600):
+        name = f"{rng.randrange(36):03d}-1-01.lif"
+        file_result = None if rng.random() < 0.25 else random_file(rng, name)
+        before = table(season)
+        log = season.amend_file(name, file_result)
+        assert log == brute_log(before, table(season)), step
+
+        if file_result is None:
+            files.pop(name, None)
+        else:
+            files[name] = file_result
+        expected = Counter()
+        for scored in files.values():
+            for club, points in zip(scored.names, scored.points):
+                expected[club] += points
+        assert dict(season.total_scores.items()) == dict(expected), step
+        assert set(season.file_scores) == set(files)
+        club = rng.choice(CLUBS)
+        assert sorted(row.file for row in season.results.club_results(club)) == sorted(
+            name for name, scored in files.items() for row in scored.rows
+            if row[5] is not None and club in row[3].split(" & ")
+        ), step
+
+def test_unchanged_file_logs_nothing():
+    rng = random.Random(5)
+    season = SeasonScores(AssociationRegistry())
+    file_result = random_file(rng, "Final")
+    season.amend_file("a.lif", file_result)
+    assert season.amend_file("a.lif", file_result) == []
+    assert season.amend_file("missing.lif", None) == []
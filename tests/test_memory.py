@@ -0,0 +1,47 @@
+# Streaming aggregation must keep the same peak memory however big the season:
+# a corpus four times larger may not raise the tracemalloc peak beyond noise.
+#
+#   python -m pytest tests/test_memory.py
+import os
+import sys
+import random
+import tempfile
+import tracemalloc
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from make_corpus import make_clubs
+from bench_memory import make_bodies, iter_members, write_season, expected_totals
+from waka_scoring import stream_season_totals, AssociationRegistry
+
+SMALL_BYTES = 2 * 1024 ** 2
+
+def traced_peak(path, in_flight):
+    tracemalloc.start()
+    try:
+        totals = stream_season_totals(path, in_flight, registry=AssociationRegistry())
+        return totals, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+@pytest.mark.parametrize("layout, suffix, in_flight", [
+    ("tar", ".tar", 0), ("zip", ".zip", 0), ("folder", "", 0), ("folder", "", 4)
+])
+def test_peak_does_not_grow_with_corpus(layout, suffix, in_flight):
+    rng = random.Random(1)
+    bodies = make_bodies(24, 500, make_clubs(200, rng), rng)
+    peaks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in (1, 4):
+            path = os.path.join(tmp, str(scale), f"WakaNats2024{suffix}")
+            os.makedirs(os.path.dirname(path))
+            used = write_season(path, layout, iter_members(bodies, SMALL_BYTES * scale))
+            totals, peak = traced_peak(path, in_flight)
+            assert dict(totals.items()) == expected_totals(used)
+            peaks.append(peak)
+    small, large = peaks
+    assert large <= small * 1.25 + 256 * 1024, f"peak grew from {small} to {large} bytes"
@@ -0,0 +1,111 @@
+# Ranking against a brute-force table: every row, rank, slice, band and chunk
+# after each random change must match sorting the points from scratch, with
+# competition-style ties (1, 2, 2, 4).
+#
+#   python -m pytest tests/test_ranking.py
+import os
+import sys
+import random
+from array import array
+from collections import Counter
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from waka_scoring import Ranking, ScoreTotals, AssociationRegistry, rank_scores, combine_scores
+
+def brute_rows(points):
+    # (rank, association, points) rows sorted from scratch
+    return [
+        (1 + sum(1 for other in points.values() if other > p), club, p)
+        for club, p in sorted(points.items(), key=lambda item: (-item[1], item[0]))
+    ]
+
+def test_ties_share_a_rank_and_skip_the_next():
+    ranking = Ranking({"B": 5, "A": 5, "C": 7, "D": 3, "E": 5})
+    assert list(ranking) == [(1, "C", 7), (2, "A", 5), (2, "B", 5), (2, "E", 5), (5, "D", 3)]
+    # A slice or index starting inside a tie keeps the tie's rank
+    assert ranking[2:4] == [(2, "B", 5), (2, "E", 5)]
+    assert ranking[3] == (2, "E", 5)
+    assert ranking[-1] == (5, "D", 3)
+    assert [ranking.rank(club) for club in "ABCDE"] == [2, 2, 1, 5, 2]
+    assert ranking.rank("missing") is None
+    assert ranking.band(4, 5) == [(2, "A", 5), (2, "B", 5), (2, "E", 5)]
+    assert ranking.band(None, 5) == ranking[1:]
+    assert ranking.band(8, 9) == []
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_updates_match_brute_force(seed):
+    rng = random.Random(seed)
+    clubs = [f"Club {i}" for i in range(40)]
+    points = {}
+    ranking = Ranking()
+    for step in range(1500):
+        club = rng.choice(clubs)
+        # Few distinct values so ties are common; None drops the association
+        value = None if rng.random() < 0.2 else rng.randint(0, 12)
+        ranking.update(club, value)
+        if value is None:
+            points.pop(club, None)
+        else:
+            points[club] = value
+
+        expected = brute_rows(points)
+        assert ranking[:] == expected, step
+        assert len(ranking) == len(expected)
+        assert [ranking.rank(club) for _, club, _ in expected] == [rank for rank, _, _ in expected]
+        if not expected:
+            continue
+        start = rng.randint(-len(expected) - 2, len(expected) + 2)
+        stop = rng.randint(-len(expected) - 2, len(expected) + 2)
+        assert ranking[start:stop] == expected[start:stop], (step, start, stop)
+        i = rng.randrange(-len(expected), len(expected))
+        assert ranking[i] == expected[i]
+        n = rng.randint(0, len(expected) + 1)
+        assert ranking.top(n) == expected[:n]
+        lo = rng.choice([None, rng.randint(0, 12)])
+        hi = rng.choice([None, rng.randint(0, 12)])
+        assert ranking.band(lo, hi) == [
+            row for row in expected if (lo is None or row[2] >= lo) and (hi is None or row[2] <= hi)
+        ], (step, lo, hi)
+        size = rng.randint(1, 7)
+        assert [row for chunk in ranking.chunks(size) for row in chunk] == expected
+        assert all(len(chunk) <= size for chunk in ranking.chunks(size))
+
+def test_live_ranking_follows_score_totals():
+    # ScoreTotals keeps its ranking() up to date as points are added and taken off
+    rng = random.Random(4)
+    registry = AssociationRegistry()
+    totals = ScoreTotals(registry)
+    clubs = [f"Club {i}" for i in range(30)]
+    ranking = totals.ranking()
+    added = []
+    for step in range(800):
+        if added and rng.random() < 0.3:
+            names, points = added.pop(rng.randrange(len(added)))
+            totals.add(registry.intern_all(names), points, sign=-1)
+        else:
+            names = [rng.choice(clubs) for _ in range(rng.randint(1, 6))]
+            points = array('i', [rng.randint(0, 8) for _ in names])
+            totals.add(registry.intern_all(names), points)
+            added.append((names, points))
+        expected = brute_rows(dict(totals.items()))
+        assert ranking[:] == expected, step
+        assert rank_scores(totals) == expected
+
+def test_combined_seasons_rank_on_summed_points():
+    # Seasons share the module's registry, as combine_scores expects
+    rng = random.Random(6)
+    clubs = [f"Combined Club {i}" for i in range(20)]
+    seasons = []
+    for _ in range(3):
+        totals = ScoreTotals()
+        names = [rng.choice(clubs) for _ in range(40)]
+        totals.add(totals.registry.intern_all(names), array('i', [rng.randint(0, 8) for _ in names]))
+        seasons.append(totals)
+    summed = Counter()
+    for totals in seasons:
+        summed.update(dict(totals.items()))
+    assert rank_scores(combine_scores(seasons)) == brute_rows(dict(summed))
@@ -0,0 +1,229 @@
+# Headless entry point: scores WakaNats{year} folders and writes the standings
+# as CSV, JSON or NDJSON without importing tkinter.
+#
+#   python waka_cli.py <parent folder> 2019 2020 --format json -o standings.json
+#   python waka_cli.py <parent folder> --all --format ndjson
+#   python waka_cli.py <parent folder> 2024 --format ndjson --watch
+#   python waka_cli.py <parent folder> --all --timings --profile run.pstats
+#   python waka_cli.py <parent folder> 2024 --races -o races.csv
+#   python waka_cli.py <parent folder> 2024 --serve 8000 --watch
+#   python waka_cli.py <parent folder> --all --stream
+#
+# A season can also be given as WakaNats{year}.zip, .tar.gz, .tgz or .tar in place
+# of the folder.
+import os
+import sys
+import csv
+import json
+import logging
+import threading
+import argparse
+
+from waka_scoring import (
+    find_year_folders, score_year_folders, stream_totals, combine_scores, rank_scores, ranking_for,
+    standings_changes, iter_folder_changes, iter_contributions, CONTRIBUTION_HEADER,
+    StageTimer, profiled, season_path, is_archive, load_points_rules, load_folder_points_rules
+)
+
+def standings_tables(year_scores):
+    # [(label, Ranking)], one per year plus the combined table when more than
+    # one year was scored. Writers iterate the rankings, so rows are streamed.
+    tables = [(str(year), ranking_for(scores)) for year, scores in year_scores.items()]
+    if len(year_scores) > 1:
+        tables.append(("all", ranking_for(combine_scores(year_scores.values()))))
+    return tables
+
+def write_csv(tables, out):
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(["Year", "Rank", "Association", "Points"])
+    for label, rows in tables:
+        for rank, club, points in rows:
+            writer.writerow([label, rank, club, points])
+
+def write_json(tables, out):
+    data = {
+        label: [{"rank": rank, "association": club, "points": points} for rank, club, points in rows]
+        for label, rows in tables
+    }
+    json.dump(data, out, indent=2, ensure_ascii=False)
+    out.write("\n")
+
+def write_ndjson(tables, out):
+    for label, rows in tables:
+        for rank, club, points in rows:
+            record = {"year": label, "rank": rank, "association": club, "points": points}
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+WRITERS = {"csv": write_csv, "json": write_json, "ndjson": write_ndjson}
+
+def write_races(seasons, out):
+    # One row per association per scoring result, ranked within its own season
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(CONTRIBUTION_HEADER)
+    writer.writerows(iter_contributions(seasons))
+
+def watch_standings(year, folder, season, out, use_inotify=True):
+    # Re-scores files as they land and writes one NDJSON line per association
+    # whose rank or points changed (rank and points are null if it dropped out)
+    rows = rank_scores(season.total_scores)
+    for batch in iter_folder_changes(folder, use_inotify=use_inotify):
+        changed = set()
+        for name, file_scores in batch:
+            changed |= season.set_file(name, file_scores)
+        if not changed:
+            continue
+        new_rows = rank_scores(season.total_scores)
+        write_ndjson([(str(year), standings_changes(rows, new_rows))], out)
+        out.flush()
+        rows = new_rows
+
+def serve_standings(seasons, address, year_folders, watch=False, use_inotify=True):
+    # Serves until interrupted; with watch, new results are scored into the
+    # served season as they land and pushed to /events subscribers
+    from waka_server import start_server, parse_address, standings_diff
+    server = start_server(seasons, parse_address(address))
+    host, port = server.server_address[:2]
+    print(f"Serving standings on http://{host}:{port}/ (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        if watch:
+            year, folder = next(iter(year_folders.items()))
+            season = seasons[year]
+            for batch in iter_folder_changes(folder, use_inotify=use_inotify):
+                moved = set()
+                # Requests render from the live season under server.lock
+                with server.lock:
+                    for name, file_scores in batch:
+                        moved.update(change[0] for change in season.amend_file(name, file_scores))
+                # Rows can change with no total moving, so /clubs bodies must
+                # still be re-rendered; publish only skips an empty diff
+                server.publish(diff=standings_diff(year, season.total_scores, moved))
+        else:
+            threading.Event().wait()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Calculate Waka Ama club standings from .lif files")
+    parser.add_argument("parent_folder", help="folder containing the WakaNats{year} folders")
+    parser.add_argument("years", nargs="*", type=int, help="years to score (≥ 2017)")
+    parser.add_argument("--all", action="store_true", help="score every WakaNats{year} folder")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and don't update the score cache")
+    parser.add_argument("--in-flight", type=int, default=0, metavar="N",
+                        help="read up to N files at once, for folders on a network share")
+    parser.add_argument("--points-rules", metavar="FILE",
+                        help="points rules JSON (default: points_rules.json in the parent folder if present)")
+    parser.add_argument("--compile", action="store_true",
+                        help="pack each scored season into one file, WakaNats{year}.season.sqlite")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and write standings changes as new results land")
+    parser.add_argument("--poll", action="store_true", help="watch by polling (for network shares)")
+    parser.add_argument("--stream", action="store_true",
+                        help="totals only, in memory bounded by the number of associations (no cache or races)")
+    parser.add_argument("--races", action="store_true",
+                        help="write one CSV row per association per race instead of the standings")
+    parser.add_argument("--serve", metavar="[HOST:]PORT",
+                        help="serve the standings as JSON over HTTP until interrupted (see waka_server.py)")
+    parser.add_argument("--timings", action="store_true", help="log per-stage timings to stderr")
+    parser.add_argument("--profile", metavar="FILE", help="write a cProfile/pstats dump of the run")
+    args = parser.parse_args(argv)
+    if not args.years and not args.all:
+        parser.error("give one or more years or --all")
+    if args.watch and (args.all or len(args.years) != 1):
+        parser.error("--watch needs exactly one year")
+    if args.watch and not args.serve and args.format != "ndjson":
+        parser.error("--watch needs --format ndjson unless it is serving")
+    if args.serve and (args.races or args.output):
+        parser.error("--serve can't be combined with --races or --output")
+    if args.stream and (args.races or args.watch or args.serve or args.compile):
+        parser.error("--stream only writes standings; it can't be combined with --races, --watch, --serve or --compile")
+    if args.races and (args.watch or args.format != "csv"):
+        parser.error("--races writes CSV and can't be combined with --watch")
+    if any(year < 2017 for year in args.years):
+        parser.error("years must be ≥ 2017")
+    return args
+
+def select_year_folders(args):
+    if args.all:
+        year_folders = find_year_folders(args.parent_folder)
+        if not year_folders:
+            sys.exit(f"No WakaNats folders found in '{args.parent_folder}'")
+    else:
+        year_folders = {}
+        for year in args.years:
+            folder = season_path(args.parent_folder, year)
+            if folder is None:
+                sys.exit(f"Folder '{os.path.join(args.parent_folder, f'WakaNats{year}')}' was not found")
+            if args.watch and is_archive(folder):
+                sys.exit(f"Can't watch an archived season: '{folder}'")
+            year_folders[year] = folder
+    if args.watch or args.stream:
+        # A season left with only its compiled store has no files to watch or stream
+        for folder in year_folders.values():
+            if not is_archive(folder) and not os.path.isdir(folder):
+                sys.exit(f"Folder '{folder}' was not found (only its compiled store is left)")
+    return year_folders
+
+def main(argv=None):
+    args = parse_args(argv)
+    year_folders = select_year_folders(args)
+    try:
+        if args.points_rules:
+            load_points_rules(args.points_rules)
+        else:
+            load_folder_points_rules(args.parent_folder)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        sys.exit(f"Could not read the points rules: {e}")
+    timer = None
+    if args.timings:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        timer = StageTimer()
+
+    write = WRITERS[args.format]
+    out = open(args.output, 'w', newline='', encoding="utf-8") if args.output else sys.stdout
+    try:
+        with profiled(args.profile):
+            if args.stream:
+                year_scores = stream_totals(year_folders, args.in_flight, timer)
+            else:
+                try:
+                    seasons = score_year_folders(year_folders, args.workers, not args.no_cache, timer, args.compile,
+                                                 args.in_flight)
+                except FileNotFoundError as e:
+                    sys.exit(str(e))
+                year_scores = {year: season.total_scores for year, season in seasons.items()}
+            start = timer.elapsed() if timer else 0.0
+            if args.serve:
+                pass
+            elif args.races:
+                write_races(seasons, out)
+            else:
+                write(standings_tables(year_scores), out)
+            if timer:
+                timer.add("export", timer.elapsed() - start)
+                logging.info("Export timings\n%s", timer.summary())
+        if args.serve:
+            serve_standings(seasons, args.serve, year_folders, args.watch, not args.poll)
+        elif args.watch:
+            out.flush()
+            year, folder = next(iter(year_folders.items()))
+            watch_standings(year, folder, seasons[year], out, not args.poll)
+    except KeyboardInterrupt:
+        pass
+    except BrokenPipeError:
+        # Piped into head or the like, which stopped reading. Point stdout at
+        # devnull so the flush at exit doesn't raise a second time.
+        if out is not sys.stdout:
+            raise
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1695 @@
+import os
+import sys
+import csv
+import json
+import time
+import queue
+import threading
+import struct
+import select
+import logging
+import hashlib
+from array import array
+from bisect import bisect_left, insort
+from functools import partial, lru_cache
+from itertools import chain, islice
+from collections import deque
+from collections.abc import Mapping
+from contextlib import closing, contextmanager
+# tarfile, zipfile and sqlite3 are imported in the functions that use them, so
+# the CLI doesn't pay for them on start-up when a season needs none of them
+
+log = logging.getLogger("waka_scoring")
+
+# Helper functions
+def read_header_line(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            return line
+    return ""
+
+def read_lif_header(filepath):
+    try:
+        with open(filepath, 'r', encoding="latin-1") as f:
+            return read_header_line(f)
+    except FileNotFoundError:
+        return ""
+
+# Points rules. A rules config lists points for places 1, 2, 3, ... plus the points
+# for any other whole-number place and for a place that isn't a number. Event
+# classes (masters, development, ...) can have their own points, chosen by the
+# first class whose keyword appears in the race's header line. The default rules
+# are the original 8, 7, ... 1 for places 1-8, 1 for any other number and 0 otherwise.
+DEFAULT_POINTS_RULES = {
+    "places": [8, 7, 6, 5, 4, 3, 2, 1],
+    "other_place": 1,
+    "not_a_number": 0,
+    "classes": []
+}
+
+class PointsTable(dict):
+    # place text -> points. The listed places are filled in up front; any other
+    # place is worked out once, the way int() reads it, and remembered.
+    def __init__(self, places, other_place=1, not_a_number=0):
+        super().__init__((str(n), points) for n, points in enumerate(places, 1))
+        self.places = list(places)
+        self.other_place = other_place
+        self.not_a_number = not_a_number
+
+    def __missing__(self, place):
+        try:
+            n = int(place)
+        except ValueError:
+            points = self.not_a_number
+        else:
+            points = self.places[n - 1] if 1 <= n <= len(self.places) else self.other_place
+        self[place] = points
+        return points
+
+    def __reduce__(self):
+        return PointsTable, (self.places, self.other_place, self.not_a_number)
+
+class PointsRules:
+    # A rules config compiled into one PointsTable per event class
+    def __init__(self, config=None):
+        self.config = config if config is not None else DEFAULT_POINTS_RULES
+        self.default = self.compile_table(self.config)
+        self.classes = [
+            ([k.lower() for k in rule.get("match", [rule["name"]])], self.compile_table(rule, self.default))
+            for rule in self.config.get("classes", [])
+        ]
+        self.fingerprint = hashlib.blake2b(
+            json.dumps(self.config, sort_keys=True).encode("utf-8"), digest_size=8
+        ).hexdigest()
+
+    def compile_table(self, rule, fallback=None):
+        # Settings a class leaves out come from the default rules
+        if fallback is None:
+            fallback = PointsTable(DEFAULT_POINTS_RULES["places"])
+        return PointsTable(
+            rule.get("places", fallback.places),
+            rule.get("other_place", fallback.other_place),
+            rule.get("not_a_number", fallback.not_a_number)
+        )
+
+    def table_for(self, header):
+        header = header.lower()
+        for keywords, table in self.classes:
+            if any(k in header for k in keywords):
+                return table
+        return self.default
+
+POINTS_RULES = PointsRules()
+
+def set_points_rules(config=None):
+    # Switches the rules used for all scoring in this process (None for the defaults).
+    # Worker processes are started with the same rules.
+    global POINTS_RULES
+    POINTS_RULES = PointsRules(config)
+    return POINTS_RULES
+
+# Rules in the parent folder apply to every season scored from it
+RULES_NAME = "points_rules.json"
+
+def load_points_rules(path):
+    with open(path, 'r', encoding="utf-8") as f:
+        return set_points_rules(json.load(f))
+
+def load_folder_points_rules(parent_folder):
+    # Uses parent_folder/points_rules.json if there is one, otherwise the default rules
+    path = os.path.join(parent_folder, RULES_NAME)
+    if os.path.isfile(path):
+        log.info("Points rules from %s", path)
+        return load_points_rules(path)
+    return set_points_rules(None)
+
+def score_fields(fields, results=None, make_row=None, table=None):
+    # The scoring loop behind score_lif_bytes and score_lif_totals. fields gives
+    # (place, association, parts) per row. Returns (associations, points) with one
+    # entry per association per result row, so an association can appear more
+    # than once. If results is a list, make_row(parts, place, assoc, points) is
+    # appended to it for every row with an association column; points is None for
+    # rows that don't score (DQ, DNS, no place or no association). table is the
+    # PointsTable to use, the default rules if not given.
+    if table is None:
+        table = POINTS_RULES.default
+    names = []
+    points_list = array('i')
+    prev_place = None
+    points = 0
+
+    for place, assoc, parts in fields:
+        if not assoc or place.upper() in ("DQ", "DNS") or place == "":
+            if results is not None:
+                results.append(make_row(parts, place, assoc, None))
+            continue
+
+        # A tie repeats the place, so the crew keeps the points of the one above
+        if place != prev_place:
+            prev_place = place
+            points = table[place]
+
+        for a in assoc.split("&"):
+            names.append(a.strip())
+            points_list.append(points)
+        if results is not None:
+            results.append(make_row(parts, place, assoc, points))
+
+    return names, points_list
+
+def result_row(parts, place, assoc, points):
+    # .lif columns: place, id, lane, last name, first name, association, time, ...
+    name = " ".join(p for p in (parts[4].strip(), parts[3].strip()) if p)
+    time = parts[6].strip() if len(parts) > 6 else ""
+    return (place, parts[2].strip(), name, assoc, time, points)
+
+# Bytes-level parsing. The file is read in one go and split into lines as bytes.
+# Points only need the place and association columns, so only those are decoded;
+# result rows decode each line once and split it no further than the time
+# column. Results match reading the file in text mode exactly (checked by
+# benchmarks/bench_parse.py): bytes.splitlines breaks on \n, \r and \r\n
+# like universal newlines, and fields are decoded before stripping because
+# str.strip also removes \x1c-\x1f, \x85 and \xa0, which bytes.strip keeps.
+
+def read_lif_bytes(filepath):
+    try:
+        with open(filepath, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return b""
+
+def split_lif_bytes(data):
+    # (header, rows): the first non-blank line decoded and stripped, and the raw
+    # lines after it
+    lines = data.splitlines()
+    for i, line in enumerate(lines):
+        header = line.decode("latin-1").strip()
+        if header:
+            return header, lines[i + 1:]
+    return "", []
+
+def iter_byte_fields(lines):
+    # (place, association, parts) for each raw line with at least six columns,
+    # splitting no further than the association and decoding just those two
+    for line in lines:
+        parts = line.split(b",", 6)
+        if len(parts) >= 6:
+            yield parts[0].decode("latin-1").strip(), parts[5].decode("latin-1").strip(), parts
+
+def iter_line_fields(lines):
+    # For result rows, which need six of the first seven columns: each line is
+    # decoded once and split no further than the time column
+    for line in lines:
+        parts = line.decode("latin-1").split(",", 7)
+        if len(parts) >= 6:
+            yield parts[0].strip(), parts[5].strip(), parts
+
+def score_lif_bytes(data):
+    # The FileResult for a file's bytes, or None if it is not a Final
+    header, lines = split_lif_bytes(data)
+    if "Final" not in header:
+        return None
+    results = []
+    names, points = score_fields(iter_line_fields(lines), results, result_row, POINTS_RULES.table_for(header))
+    return FileResult(event_name(header), names, points, results)
+
+class FileResult:
+    # What scoring one Final produces: its event name, (names, points) with one
+    # entry per association per scoring row, and all of its result rows
+    __slots__ = ("event", "names", "points", "rows")
+
+    def __init__(self, event, names, points, rows):
+        self.event = event
+        self.names = names
+        self.points = points
+        self.rows = rows
+
+def score_lif_path(filepath):
+    # Returns the file's FileResult, or None if it is not a Final
+    return score_lif_bytes(read_lif_bytes(filepath))
+
+def file_digest(filepath):
+    h = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def bytes_digest(data):
+    # Same digest as file_digest, for bytes already read
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def score_file(filepath, with_digest=False, timed=False):
+    # Worker entry point. Returns (digest, file_result, read_s, parse_s); digest is
+    # None unless asked for, and the timings are only measured when timed. The
+    # file is read once: the digest is taken over the same bytes that are scored.
+    digest = None
+    start = time.perf_counter()
+    try:
+        with open(filepath, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        data = b""
+    else:
+        if with_digest:
+            digest = bytes_digest(data)
+    if not timed:
+        return digest, score_lif_bytes(data), 0.0, 0.0
+
+    read_s = time.perf_counter() - start
+    start = time.perf_counter()
+    file_result = score_lif_bytes(data)
+    return digest, file_result, read_s, time.perf_counter() - start
+
+class StageTimer:
+    # Wall time per named stage of a run. read and parse are measured per file in
+    # whichever process scored it, so with a process pool they are summed across
+    # workers rather than wall time.
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = {}
+        self.calls = {}
+        self.files = 0
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds, calls=1):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def files_per_second(self):
+        elapsed = self.elapsed()
+        return self.files / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        lines = [f"{self.files} files in {self.elapsed():.3f} s ({self.files_per_second():.0f} files/s)"]
+        for name, seconds in self.seconds.items():
+            lines.append(f"  {name:<9} {seconds:8.3f} s  ({self.calls[name]} calls)")
+        return "\n".join(lines)
+
+@contextmanager
+def profiled(path):
+    # Writes a cProfile/pstats file covering the enclosed code when path is set.
+    # Profiles the calling thread only.
+    if not path:
+        yield
+        return
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        log.info("Profile written to %s", path)
+
+def cache_path_for(folder):
+    # The cache sits next to the year folder, e.g. WakaNats2019.scorecache.sqlite
+    return os.path.normpath(folder) + ".scorecache.sqlite"
+
+def race_type(header):
+    # Same test as the scorer: any header mentioning "Final" is a Final
+    if "Final" in header:
+        return "Final"
+    if "Semi" in header:
+        return "Semi"
+    if "Heat" in header:
+        return "Heat"
+    return "Other"
+
+def event_name(header):
+    parts = header.split(",")
+    if len(parts) > 3 and parts[3].strip():
+        return parts[3].strip()
+    return header
+
+def manifest_path_for(folder):
+    return os.path.normpath(folder) + ".manifest.json"
+
+def load_manifest(folder):
+    try:
+        with open(manifest_path_for(folder), 'r', encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"files": {}}
+
+def update_manifest(folder, max_in_flight=0, stop_event=None):
+    # Lists every .lif file with its race type, event name, size and mtime. Only
+    # files that are new or changed since the last scan have their header read,
+    # max_in_flight at a time when set (see iter_loaded). Once stop_event is set
+    # the scan ends early: the headers read so far are saved and the files not
+    # yet read are left out, to be read next time.
+    if is_archive(folder):
+        return update_archive_manifest(folder)
+    manifest = load_manifest(folder)
+    known = manifest.get("files", {})
+    entries = {}
+    stale = {}
+    with os.scandir(folder) as it:
+        for entry in it:
+            if stop_event is not None and stop_event.is_set():
+                return manifest
+            if not entry.name.lower().endswith(".lif") or not entry.is_file():
+                continue
+            st = entry.stat()
+            info = known.get(entry.name)
+            if info is None or info["size"] != st.st_size or info["mtime_ns"] != st.st_mtime_ns:
+                stale[entry.path] = (entry.name, st)
+            entries[entry.name] = info
+
+    if max_in_flight:
+        headers = iter_loaded(list(stale), read_lif_header, max_in_flight)
+    else:
+        headers = ((path, read_lif_header(path)) for path in stale)
+    with closing(headers):
+        for path, header in headers:
+            if stop_event is not None and stop_event.is_set():
+                entries = {name: info for name, info in entries.items() if info is not None}
+                break
+            name, st = stale[path]
+            entries[name] = {
+                "type": race_type(header),
+                "event": event_name(header),
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns
+            }
+
+    changed = bool(stale) or len(entries) != len(known)
+    manifest = {"folder": os.path.basename(os.path.normpath(folder)), "files": entries}
+    if changed:
+        save_manifest(folder, manifest)
+    return manifest
+
+def save_manifest(folder, manifest):
+    try:
+        tmp_path = manifest_path_for(folder) + ".tmp"
+        with open(tmp_path, 'w', encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, manifest_path_for(folder))
+    except OSError:
+        # Read-only share, the manifest is still usable for this run
+        pass
+
+def manifest_finals(manifest):
+    return [name for name, info in manifest["files"].items() if info["type"] == "Final"]
+
+def finals_per_year(parent_folder):
+    # {year: number of Finals} for every WakaNats{year} season, from the manifests.
+    # A season left with only its compiled store is counted from its last manifest.
+    counts = {}
+    for year, folder in find_year_folders(parent_folder).items():
+        if is_archive(folder) or os.path.isdir(folder):
+            manifest = update_manifest(folder)
+        else:
+            manifest = load_manifest(folder)
+        counts[year] = len(manifest_finals(manifest))
+    return counts
+
+# Archived seasons. A WakaNats{year}.zip, .tar.gz, .tgz or .tar can stand in for
+# the folder; its .lif members are read straight out of the archive. Zip members
+# can be read independently, so they are spread over the worker processes; a
+# compressed tar can only be read front to back, so it is streamed in one pass.
+ARCHIVE_SUFFIXES = (".zip", ".tar.gz", ".tgz", ".tar")
+
+def archive_suffix(path):
+    lower = path.lower()
+    for suffix in ARCHIVE_SUFFIXES:
+        if lower.endswith(suffix):
+            return suffix
+    return None
+
+def is_archive(path):
+    return archive_suffix(path) is not None and os.path.isfile(path)
+
+def season_path(parent_folder, year):
+    # The WakaNats{year} folder, or an archive of it if there is no folder. A season
+    # left with only its compiled store maps to the (missing) folder the store is
+    # loaded for. None if there is nothing for the year.
+    folder = os.path.join(parent_folder, f"WakaNats{year}")
+    if os.path.isdir(folder):
+        return folder
+    for suffix in ARCHIVE_SUFFIXES:
+        if os.path.isfile(folder + suffix):
+            return folder + suffix
+    if os.path.isfile(store_path_for(folder)):
+        return folder
+    return None
+
+def update_archive_manifest(archive):
+    # Manifest of an archive's .lif members. Archives don't change once written, so
+    # the members are only scanned again if the archive's size or mtime moves.
+    st = os.stat(archive)
+    manifest = load_manifest(archive)
+    if manifest.get("archive") == {"size": st.st_size, "mtime_ns": st.st_mtime_ns}:
+        return manifest
+
+    entries = {}
+    for name, size, f in iter_archive_members(archive):
+        with f:
+            header = read_header_bytes(f)
+        entries[name] = {"type": race_type(header), "event": event_name(header), "size": size}
+    manifest = {
+        "folder": os.path.basename(archive),
+        "archive": {"size": st.st_size, "mtime_ns": st.st_mtime_ns},
+        "files": entries
+    }
+    save_manifest(archive, manifest)
+    return manifest
+
+def read_header_bytes(f):
+    # read_header_line for a binary file. readline only breaks on \n, so each piece
+    # is split again for lone \r line breaks.
+    for chunk in iter(f.readline, b""):
+        for line in chunk.splitlines():
+            header = line.decode("latin-1").strip()
+            if header:
+                return header
+    return ""
+
+def iter_archive_members(archive):
+    # (member name, size, binary file object) for each .lif member, in archive order.
+    # A tar member can only be read before moving on to the next one.
+    import tarfile
+    import zipfile
+    if archive_suffix(archive) == ".zip":
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(".lif"):
+                    yield info.filename, info.file_size, zf.open(info)
+        return
+    with tarfile.open(archive, "r|*") as tf:
+        for member in tf:
+            if member.isfile() and member.name.lower().endswith(".lif"):
+                yield member.name, member.size, tf.extractfile(member)
+
+@lru_cache(maxsize=8)
+def open_zip(archive):
+    # Kept open per process so pool workers don't re-read the central directory per member
+    import zipfile
+    return zipfile.ZipFile(archive)
+
+def score_zip_member(archive, name):
+    # score_file for a zip member
+    start = time.perf_counter()
+    data = open_zip(archive).read(name)
+    read_s = time.perf_counter() - start
+    start = time.perf_counter()
+    file_result = score_lif_bytes(data)
+    return None, file_result, read_s, time.perf_counter() - start
+
+def score_archive_members(archive, names, workers=1, executor=None, timer=None):
+    # (name, file_scores) for the given members. Zip members go through map_paths
+    # like files in a folder; a tar is streamed once and yields in archive order.
+    if timer is None:
+        timer = StageTimer()
+    if archive_suffix(archive) == ".zip":
+        if workers <= 1 and executor is None:
+            # Read in this process without leaving the archive open afterwards
+            import zipfile
+            with zipfile.ZipFile(archive) as zf:
+                for name in names:
+                    start = time.perf_counter()
+                    data = zf.read(name)
+                    timer.add("read", time.perf_counter() - start)
+                    with timer.stage("parse"):
+                        file_result = score_lif_bytes(data)
+                    yield name, file_result
+            return
+        func = partial(score_zip_member, archive)
+        yield from merge_scored(names, {}, {}, map_paths(func, names, workers, executor), None, timer)
+        return
+
+    wanted = set(names)
+    start = time.perf_counter()
+    for name, size, f in iter_archive_members(archive):
+        if name not in wanted:
+            continue
+        data = f.read()
+        timer.add("read", time.perf_counter() - start)
+        with timer.stage("parse"):
+            file_result = score_lif_bytes(data)
+        yield name, file_result
+        start = time.perf_counter()
+
+CACHE_VERSION = 4
+
+class ScoreCache:
+    # Per-file scores keyed on name, size, mtime and content hash. A file whose size
+    # and mtime match is a hit without being opened; if only the mtime moved, the
+    # content hash decides.
+    def __init__(self, path):
+        import sqlite3
+        self.conn = sqlite3.connect(path)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS files")
+            self.conn.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "name TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "digest TEXT NOT NULL, final INTEGER NOT NULL, scores TEXT)"
+        )
+        # Points depend on the rules, so scores cached under other rules are dropped
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        rules = self.conn.execute("SELECT value FROM meta WHERE key = 'rules'").fetchone()
+        if rules is None or rules[0] != POINTS_RULES.fingerprint:
+            self.conn.execute("DELETE FROM files")
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('rules', ?)", (POINTS_RULES.fingerprint,)
+            )
+        self.entries = {
+            row[0]: row[1:]
+            for row in self.conn.execute("SELECT name, size, mtime_ns, digest, final, scores FROM files")
+        }
+
+    def lookup(self, name, filepath, st):
+        # Returns (True, file_scores) on a hit and (False, None) on a miss
+        entry = self.entries.get(name)
+        if entry is None or entry[0] != st.st_size:
+            return False, None
+        size, mtime_ns, digest, final, scores = entry
+        if mtime_ns != st.st_mtime_ns:
+            if file_digest(filepath) != digest:
+                return False, None
+            self.conn.execute("UPDATE files SET mtime_ns = ? WHERE name = ?", (st.st_mtime_ns, name))
+        if not final:
+            return True, None
+        event, names, points, rows = json.loads(scores)
+        return True, FileResult(event, names, array('i', points), [tuple(row) for row in rows])
+
+    def store(self, name, st, digest, file_scores):
+        final = file_scores is not None
+        scores = None
+        if final:
+            scores = json.dumps([file_scores.event, file_scores.names, file_scores.points.tolist(), file_scores.rows])
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (name, size, mtime_ns, digest, final, scores) VALUES (?, ?, ?, ?, ?, ?)",
+            (name, st.st_size, st.st_mtime_ns, digest, int(final), scores)
+        )
+
+    def prune(self, names):
+        stale = set(self.entries) - set(names)
+        self.conn.executemany("DELETE FROM files WHERE name = ?", [(name,) for name in stale])
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+def open_score_cache(folder):
+    import sqlite3
+    try:
+        return ScoreCache(cache_path_for(folder))
+    except sqlite3.Error:
+        # e.g. a read-only results share, just run without the cache
+        return None
+
+def process_pool(workers):
+    # Imported here so single-process runs (and the CLI start-up) skip multiprocessing.
+    # Workers start with this process's points rules.
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers, initializer=set_points_rules, initargs=(POINTS_RULES.config,))
+
+def map_paths(func, paths, workers=1, executor=None):
+    # Returns a generator of func(path) for each path in order. With workers > 1 the
+    # calls are submitted to a process pool straight away (the shared one if given).
+    if executor is None and (workers <= 1 or len(paths) < 2):
+        return (func(path) for path in paths)
+
+    chunksize = max(1, len(paths) // (max(workers, 1) * 8))
+    if executor is not None:
+        return executor.map(func, paths, chunksize=chunksize)
+    executor = process_pool(workers)
+    return pool_results(executor, executor.map(func, paths, chunksize=chunksize))
+
+def pool_results(executor, results):
+    try:
+        yield from results
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def score_lif_files(folder, files, workers=1, use_cache=False, executor=None, timer=None, max_in_flight=0):
+    # Returns a generator of (filename, file_scores) per file in the order given;
+    # file_scores is None for non-Final files. With workers > 1 the files are scored
+    # in a process pool. With use_cache only files that are new or changed since
+    # the last run are read. Cache lookups and pool submissions happen up front.
+    # A StageTimer collects cache, read and parse times. max_in_flight switches to
+    # score_lif_files_async, which yields in arrival order and skips the cache.
+    if is_archive(folder):
+        # Archived seasons are read as they are, without the score cache
+        return score_archive_members(folder, files, workers, executor, timer)
+    if max_in_flight:
+        return score_lif_files_async(folder, files, max_in_flight, timer)
+    timed = timer is not None
+    if timer is None:
+        timer = StageTimer()
+    with timer.stage("cache"):
+        cache = open_score_cache(folder) if use_cache else None
+    if cache is None:
+        func = partial(score_file, timed=timed)
+        scored = map_paths(func, [os.path.join(folder, f) for f in files], workers, executor)
+        return merge_scored(files, {}, {}, scored, None, timer)
+
+    lookup_start = time.perf_counter()
+
+    hits = {}
+    stats = {}
+    misses = []
+    for f in files:
+        filepath = os.path.join(folder, f)
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError:
+            misses.append(f)
+            continue
+        stats[f] = st
+        hit, file_scores = cache.lookup(f, filepath, st)
+        if hit:
+            hits[f] = file_scores
+        else:
+            misses.append(f)
+    timer.add("cache", time.perf_counter() - lookup_start, len(files))
+
+    func = partial(score_file, with_digest=True, timed=timed)
+    scored = map_paths(func, [os.path.join(folder, f) for f in misses], workers, executor)
+    return merge_scored(files, hits, stats, scored, cache, timer)
+
+def merge_scored(files, hits, stats, scored, cache, timer):
+    try:
+        for f in files:
+            if f in hits:
+                yield f, hits[f]
+                continue
+            digest, file_scores, read_s, parse_s = next(scored)
+            timer.add("read", read_s)
+            timer.add("parse", parse_s)
+            if cache is not None and digest is not None and f in stats:
+                cache.store(f, stats[f], digest, file_scores)
+            yield f, file_scores
+        if cache is not None:
+            cache.prune(files)
+    finally:
+        scored.close()
+        if cache is not None:
+            cache.close()
+
+# Latency-tolerant loading for results folders on a network share, where every open
+# and stat costs a round trip. Reads run on an asyncio loop in a background thread,
+# up to max_in_flight at a time, and are handed over in the order they finish, so
+# parsing and merging overlap with the reads still in flight.
+
+def iter_loaded(paths, load, max_in_flight=16):
+    # Yields (path, load(path)) for every path in the order the loads finish.
+    # load runs on a thread pool driven by asyncio; an exception from load is
+    # raised here for that path. Stopping early lets the in-flight loads finish
+    # and starts no more. At most max_in_flight results wait to be taken, and a
+    # load that finishes while they do holds its thread, so a slow consumer
+    # holds back the reads rather than letting loaded files pile up.
+    results = queue.Queue(maxsize=max(1, max_in_flight))
+    stop = threading.Event()
+
+    def deliver(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    loader = threading.Thread(
+        target=run_loads, args=(paths, load, max_in_flight, deliver, stop), daemon=True
+    )
+    loader.start()
+    try:
+        for _ in range(len(paths)):
+            path, result, error = results.get()
+            if error is not None:
+                raise error
+            yield path, result
+    finally:
+        stop.set()
+
+def run_loads(paths, load, max_in_flight, deliver, stop):
+    # Imported here so the CLI start-up and synchronous runs skip asyncio
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    def load_one(path):
+        # Delivered from the pool thread, so a full queue blocks that thread and
+        # not the event loop
+        try:
+            item = (path, load(path), None)
+        except Exception as e:
+            item = (path, None, e)
+        deliver(item)
+
+    async def load_all():
+        loop = asyncio.get_running_loop()
+        pending = iter(paths)
+
+        async def reader():
+            # Readers share one iterator, so each path is loaded once
+            for path in pending:
+                if stop.is_set():
+                    return
+                await loop.run_in_executor(executor, load_one, path)
+
+        await asyncio.gather(*(reader() for _ in range(max(1, min(max_in_flight, len(paths))))))
+
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+        asyncio.run(load_all())
+
+def score_lif_files_async(folder, files, max_in_flight=16, timer=None, read=read_lif_bytes):
+    # Generator of (filename, file_scores) in the order the reads finish. Time spent
+    # waiting for the next file counts as read, so reads hidden behind parsing are free.
+    # read(path) -> bytes can be swapped for a stand-in, e.g. one that adds latency.
+    if timer is None:
+        timer = StageTimer()
+    paths = {os.path.join(folder, f): f for f in files}
+    loaded = iter_loaded(list(paths), read, max_in_flight)
+    try:
+        while True:
+            start = time.perf_counter()
+            item = next(loaded, None)
+            timer.add("read", time.perf_counter() - start, 0 if item is None else 1)
+            if item is None:
+                return
+            path, data = item
+            with timer.stage("parse"):
+                file_scores = score_lif_bytes(data)
+            yield paths[path], file_scores
+    finally:
+        loaded.close()
+
+def find_year_folders(parent_folder):
+    # {year: folder} for every WakaNats{year} folder, oldest first. A season with
+    # no folder but an archive (WakaNats{year}.zip etc.) maps to the archive, and
+    # one with only its compiled store (WakaNats{year}.season.sqlite) to the
+    # missing folder.
+    year_folders = {}
+    archives = {}
+    for name in sorted(os.listdir(parent_folder)):
+        folder = os.path.join(parent_folder, name)
+        if name.endswith(".season.sqlite"):
+            stem = name[:-len(".season.sqlite")]
+            if stem.startswith("WakaNats") and stem[8:].isdigit():
+                archives.setdefault(int(stem[8:]), os.path.join(parent_folder, stem))
+            continue
+        suffix = archive_suffix(name)
+        stem = name[:-len(suffix)] if suffix else name
+        if not stem.startswith("WakaNats") or not stem[8:].isdigit():
+            continue
+        if suffix is None and os.path.isdir(folder):
+            year_folders[int(stem[8:])] = folder
+        elif suffix is not None and os.path.isfile(folder):
+            archives.setdefault(int(stem[8:]), folder)
+    for year, archive in archives.items():
+        year_folders.setdefault(year, archive)
+    return dict(sorted(year_folders.items()))
+
+def score_seasons(seasons, workers=1, use_cache=False, timer=None, max_in_flight=0):
+    # seasons is a list of (year, folder, files). Yields (year, filename, file_scores).
+    # Every season is queued on one shared process pool before any results are
+    # merged, so the pool does not drain between years.
+    executor = process_pool(workers) if workers > 1 and not max_in_flight else None
+    runs = []
+    try:
+        for year, folder, files in seasons:
+            runs.append((year, score_lif_files(folder, files, workers, use_cache, executor, timer, max_in_flight)))
+        for year, results in runs:
+            for f, file_scores in results:
+                yield year, f, file_scores
+    finally:
+        for year, results in runs:
+            results.close()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+class AssociationRegistry:
+    # Interns association names to small integer ids. The GUI interns from its
+    # scoring thread and the Tk thread at once, so new names are added under a
+    # lock; a name goes into names before ids, so an id read without the lock
+    # always has its name.
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.lock = threading.Lock()
+
+    def intern(self, name):
+        i = self.ids.get(name)
+        if i is None:
+            with self.lock:
+                i = self.ids.get(name)
+                if i is None:
+                    self.names.append(name)
+                    i = self.ids[name] = len(self.names) - 1
+        return i
+
+    def intern_all(self, names):
+        # ids for a list of names in one pass when all are known (array() raises
+        # TypeError on the None of an unknown name). New names are interned
+        # first, once each and in first-seen order, and the pass repeated.
+        ids = self.ids
+        try:
+            return array('i', map(ids.get, names))
+        except TypeError:
+            pass
+        with self.lock:
+            for name in dict.fromkeys(names):
+                if name not in ids:
+                    self.names.append(name)
+                    ids[name] = len(self.names) - 1
+        return array('i', map(ids.get, names))
+
+# Shared by every season so per-season totals line up id for id
+ASSOCIATIONS = AssociationRegistry()
+
+class Ranking:
+    # Associations ordered by points, highest first, ties by name. Entries are
+    # (-points, name) kept sorted with bisect, so a change moves one entry instead
+    # of re-sorting and rank lookups are O(log n). Ranks are competition style:
+    # tied associations share a rank and the next rank is skipped (1, 2, 2, 4).
+    # Indexing and slicing give (rank, association, points) rows.
+    def __init__(self, scores=None):
+        self.points = dict(scores.items()) if scores is not None else {}
+        self.keys = sorted((-points, club) for club, points in self.points.items())
+
+    def update(self, club, points):
+        # points None drops the association
+        old = self.points.get(club)
+        if old == points:
+            return
+        if old is not None:
+            del self.keys[bisect_left(self.keys, (-old, club))]
+            del self.points[club]
+        if points is not None:
+            insort(self.keys, (-points, club))
+            self.points[club] = points
+
+    def rank(self, club):
+        # Competition rank of an association, or None if it has no points
+        points = self.points.get(club)
+        if points is None:
+            return None
+        return bisect_left(self.keys, (-points,)) + 1
+
+    def top(self, n):
+        return self[:n]
+
+    def band(self, lo=None, hi=None):
+        # Rows with lo <= points <= hi; lo None runs to the bottom of the table
+        keys = self.keys
+        start = 0 if hi is None else bisect_left(keys, (-hi,))
+        stop = start
+        while stop < len(keys) and (lo is None or -keys[stop][0] >= lo):
+            stop += 1
+        return self[start:stop]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk
+
+    def chunks(self, size=None):
+        # Rows in lists of up to size. Walks a shallow copy of the order so an
+        # update landing mid-export can't shuffle rows between chunks.
+        keys = list(self.keys)
+        size = size or EXPORT_CHUNK
+        previous = rank = None
+        for start in range(0, len(keys), size):
+            rows = []
+            for position in range(start, min(start + size, len(keys))):
+                neg, club = keys[position]
+                if neg != previous:
+                    rank = position + 1
+                    previous = neg
+                rows.append((rank, club, -neg))
+            yield rows
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            neg, club = self.keys[index]
+            return bisect_left(self.keys, (neg,)) + 1, club, -neg
+        start, stop, _ = index.indices(len(self.keys))
+        rows = []
+        keys = self.keys
+        previous = rank = None
+        for position in range(start, stop):
+            neg, club = keys[position]
+            if neg != previous:
+                rank = position + 1 if rows else bisect_left(keys, (neg,)) + 1
+                previous = neg
+            rows.append((rank, club, -neg))
+        return rows
+
+class ScoreTotals(Mapping):
+    # Points per association, kept in an array indexed by interned id. Reads like a
+    # mapping of association name to points; an association is present once any
+    # result row for it has been added and not taken off again.
+    def __init__(self, registry=None):
+        self.registry = registry if registry is not None else ASSOCIATIONS
+        self.points = array('q')
+        self.counts = array('q')
+        self.ranked = None
+
+    def grow(self):
+        missing = len(self.registry.names) - len(self.points)
+        if missing > 0:
+            self.points.extend(array('q', bytes(8 * missing)))
+            self.counts.extend(array('q', bytes(8 * missing)))
+
+    def add(self, ids, points, sign=1):
+        # points[k] onto ids[k] (ids may repeat), or taken off with sign -1. A
+        # season's batch is summed in lists, which index faster than arrays, and
+        # copied back once; a single file's worth goes straight into the arrays.
+        self.grow()
+        batch = len(ids) > len(self.points)
+        totals = self.points.tolist() if batch else self.points
+        counts = self.counts.tolist() if batch else self.counts
+        if sign < 0:
+            points = [-p for p in points]
+        for i, p in zip(ids, points):
+            totals[i] += p
+            counts[i] += sign
+        if batch:
+            self.points = array('q', totals)
+            self.counts = array('q', counts)
+        if self.ranked is not None:
+            self.rerank(set(ids))
+
+    def add_totals(self, other):
+        self.grow()
+        totals = self.points
+        counts = self.counts
+        for i, (p, count) in enumerate(zip(other.points, other.counts)):
+            if count:
+                totals[i] += p
+                counts[i] += count
+        if self.ranked is not None:
+            self.rerank(i for i, count in enumerate(other.counts) if count)
+
+    def ranking(self):
+        # Ranking of these totals, built on first use and then kept up to date
+        if self.ranked is None:
+            self.ranked = Ranking(self)
+        return self.ranked
+
+    def rerank(self, ids):
+        if self.ranked is not None:
+            names = self.registry.names
+            for i in ids:
+                self.ranked.update(names[i], self.value(i))
+
+    def value(self, i):
+        # Points for an id, or None if the association is not present
+        if i < len(self.counts) and self.counts[i]:
+            return self.points[i]
+        return None
+
+    def __getitem__(self, name):
+        i = self.registry.ids.get(name)
+        points = None if i is None else self.value(i)
+        if points is None:
+            raise KeyError(name)
+        return points
+
+    def __iter__(self):
+        names = self.registry.names
+        return (names[i] for i, count in enumerate(self.counts) if count)
+
+    def __len__(self):
+        return len(self.counts) - self.counts.count(0)
+
+    def items(self):
+        names = self.registry.names
+        return [(names[i], points) for i, (points, count) in enumerate(zip(self.points, self.counts)) if count]
+
+def combine_scores(score_totals):
+    combined = ScoreTotals()
+    for totals in score_totals:
+        combined.add_totals(totals)
+    return combined
+
+class ResultRow:
+    __slots__ = ("file", "event", "place", "lane", "name", "association", "time", "points")
+
+    def __init__(self, file, event, place, lane, name, association, time, points):
+        self.file = file
+        self.event = event
+        self.place = place
+        self.lane = lane
+        self.name = name
+        self.association = association
+        self.time = time
+        self.points = points
+
+    def associations(self):
+        return [a.strip() for a in self.association.split("&")]
+
+class ResultStore:
+    # Every result row of the Finals scored so far, kept per file so a file can
+    # be replaced. Exports and breakdowns are answered from here without
+    # re-reading any .lif file. by_club indexes the scoring rows by association
+    # as {association: {file: [rows]}}. Files loaded in bulk (add_files) are
+    # only turned into rows and indexed the first time rows are asked for, so a
+    # run that just ranks associations never pays for it; the lock keeps a
+    # breakdown on one thread from reading a half-built index.
+    def __init__(self):
+        self.by_file = {}
+        self.by_club = {}
+        self.unindexed = {}
+        self.lock = threading.Lock()
+
+    def index(self):
+        with self.lock:
+            if not self.unindexed:
+                return
+            file_results = self.unindexed
+            self.unindexed = {}
+            by_file = self.by_file
+            by_club = self.by_club
+            for name, file_result in file_results.items():
+                event = file_result.event
+                rows = by_file[name] = [ResultRow(name, event, *row) for row in file_result.rows]
+                for row in rows:
+                    if row.points is not None:
+                        for club in dict.fromkeys(row.associations()):
+                            by_club.setdefault(club, {}).setdefault(name, []).append(row)
+
+    def set_file(self, name, file_result):
+        self.index()
+        for club in {club for row in self.by_file.pop(name, ()) if row.points is not None for club in row.associations()}:
+            files = self.by_club[club]
+            files.pop(name, None)
+            if not files:
+                del self.by_club[club]
+        if file_result is None:
+            return
+
+        event = file_result.event
+        rows = self.by_file[name] = [ResultRow(name, event, *row) for row in file_result.rows]
+        for row in rows:
+            if row.points is not None:
+                for club in dict.fromkeys(row.associations()):
+                    self.by_club.setdefault(club, {}).setdefault(name, []).append(row)
+
+    def add_files(self, file_results):
+        # set_file for {name: FileResult} of files not in the store yet
+        with self.lock:
+            self.unindexed.update(file_results)
+
+    def __iter__(self):
+        # Over a snapshot of the files so a watch update can't break an export in progress
+        self.index()
+        for rows in list(self.by_file.values()):
+            yield from rows
+
+    def __len__(self):
+        self.index()
+        return sum(len(rows) for rows in self.by_file.values())
+
+    def club_results(self, club):
+        # Scoring rows an association earned points from
+        self.index()
+        return [row for rows in list(self.by_club.get(club, {}).values()) for row in rows]
+
+class SeasonScores:
+    # Totals for one season plus each file's contribution as (ids, points) arrays,
+    # so a file that changes can be re-scored by taking its old points off and
+    # adding the new ones. results holds every parsed row.
+    def __init__(self, registry=None):
+        self.file_scores = {}
+        self.total_scores = ScoreTotals(registry)
+        self.results = ResultStore()
+        self.pending = None
+
+    def add_file(self, name, file_scores):
+        # set_file for loading a season: new files are only queued, and flush()
+        # interns their names and adds their points to total_scores in one batch.
+        # A file already in the season goes through set_file.
+        if name in self.file_scores or (self.pending and name in self.pending):
+            self.flush()
+            self.set_file(name, file_scores)
+        elif file_scores is not None:
+            if self.pending is None:
+                self.pending = {}
+            self.pending[name] = file_scores
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending = self.pending
+        self.pending = None
+        totals = self.total_scores
+        self.results.add_files(pending)
+        ids = totals.registry.intern_all(list(chain.from_iterable(fs.names for fs in pending.values())))
+        points = array('i')
+        file_scores = self.file_scores
+        start = 0
+        for name, scored in pending.items():
+            stop = start + len(scored.names)
+            file_scores[name] = (ids[start:stop], scored.points)
+            points.extend(scored.points)
+            start = stop
+        totals.add(ids, points)
+
+    def set_file(self, name, file_scores):
+        # file_scores is a FileResult, or None to drop the file.
+        # Returns the clubs whose totals changed.
+        self.flush()
+        totals = self.total_scores
+        self.results.set_file(name, file_scores)
+        old = self.file_scores.pop(name, None)
+        new = None
+        if file_scores is not None:
+            new = (totals.registry.intern_all(file_scores.names), file_scores.points)
+
+        touched = set(old[0] if old else ()) | set(new[0] if new else ())
+        before = {i: totals.value(i) for i in touched}
+        if old is not None:
+            totals.add(*old, sign=-1)
+        if new is not None:
+            self.file_scores[name] = new
+            totals.add(*new)
+
+        names = totals.registry.names
+        return {names[i] for i in touched if totals.value(i) != before[i]}
+
+    def amend_file(self, name, file_scores):
+        # set_file for one re-exported file, returning the change log: an
+        # (association, old rank, new rank, old points, new points) row for every
+        # association that moved, in new rank order. Only the clubs this file
+        # scores for and the part of the table between their old and new points
+        # are looked at, so the cost follows the file rather than the season.
+        totals = self.total_scores
+        ranking = totals.ranking()
+        names = totals.registry.names
+        old = self.file_scores.get(name)
+        candidates = {names[i] for i in old[0]} if old else set()
+        if file_scores is not None:
+            candidates.update(file_scores.names)
+        before = {club: (ranking.rank(club), totals.get(club)) for club in candidates}
+
+        changed = self.set_file(name, file_scores)
+        moved = {club: (before[club][1], totals.get(club)) for club in changed}
+        if not moved:
+            return []
+
+        # Another association's rank only moves if a changed one crossed its points
+        points = [p for pair in moved.values() for p in pair]
+        lo = None if None in points else min(points)
+        hi = max(p for p in points if p is not None)
+        log = []
+        for rank, club, club_points in ranking.band(lo, hi):
+            if club in moved:
+                continue
+            old_rank = rank
+            for old_points, new_points in moved.values():
+                old_rank += (old_points is not None and old_points > club_points) - \
+                    (new_points is not None and new_points > club_points)
+            if old_rank != rank:
+                log.append((club, old_rank, rank, club_points, club_points))
+        for club, (old_points, new_points) in moved.items():
+            log.append((club, before[club][0], ranking.rank(club), old_points, new_points))
+        log.sort(key=lambda row: (row[2] is None, row[2] or 0, row[0]))
+        return log
+
+# Compiled seasons. A season folder's parsed results can be packed into one SQLite
+# file next to it (WakaNats2019.season.sqlite). Each file's association names and
+# points are stored ready to add up and its result rows as JSON that is only
+# decoded when a breakdown or export first needs them, so a reload is one
+# directory scan and one read of a few thousand records. The store lists every
+# .lif file it was built from; if any has been added, removed or changed since,
+# the folder is scored again and the store rebuilt. That check stats every file,
+# because a Final amended in place leaves the folder's own mtime alone. A season
+# whose folder is gone is loaded from its store as it is.
+STORE_VERSION = 3
+
+def store_path_for(folder):
+    return os.path.normpath(folder) + ".season.sqlite"
+
+def folder_listing(folder):
+    # {name: (size, mtime_ns)} for the .lif files in folder, from one directory scan
+    listing = {}
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.name.lower().endswith(".lif") and entry.is_file():
+                st = entry.stat()
+                listing[entry.name] = (st.st_size, st.st_mtime_ns)
+    return listing
+
+def write_season_store(folder, season, manifest=None):
+    # Packs a scored season into its store. manifest is the listing the season was
+    # scored from (the saved manifest by default). Returns False if it can't be written.
+    import sqlite3
+    if manifest is None:
+        manifest = load_manifest(folder)
+    path = store_path_for(folder)
+    tmp_path = path + ".tmp"
+    names = season.total_scores.registry.names
+    rows = {}
+    for row in season.results:
+        rows.setdefault(row.file, []).append((row.place, row.lane, row.name, row.association, row.time, row.points))
+    records = []
+    for name, info in manifest["files"].items():
+        scores = file_rows = None
+        if name in season.file_scores:
+            ids, points = season.file_scores[name]
+            scores = json.dumps([[names[i] for i in ids], list(points)])
+            file_rows = json.dumps(rows.get(name, []))
+        records.append((name, info["size"], info["mtime_ns"], info["type"], info["event"], scores, file_rows))
+    try:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        with closing(sqlite3.connect(tmp_path)) as conn:
+            conn.execute(f"PRAGMA user_version = {STORE_VERSION}")
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("INSERT INTO meta VALUES ('rules', ?)", (POINTS_RULES.fingerprint,))
+            conn.execute(
+                "CREATE TABLE files (name TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+                "mtime_ns INTEGER NOT NULL, type TEXT NOT NULL, event TEXT, scores TEXT, rows TEXT)"
+            )
+            conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", records)
+            conn.commit()
+        os.replace(tmp_path, path)
+    except (OSError, sqlite3.Error) as e:
+        log.warning("Could not write %s: %s", path, e)
+        return False
+    return True
+
+def load_season_store(folder):
+    # SeasonScores from the folder's store, or None if there is no usable store or
+    # the folder has changed since it was written. If the folder itself is gone the
+    # store is used as it is.
+    import sqlite3
+    path = store_path_for(folder)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != STORE_VERSION:
+                return None
+            rules = conn.execute("SELECT value FROM meta WHERE key = 'rules'").fetchone()
+            if rules is None or rules[0] != POINTS_RULES.fingerprint:
+                return None
+            files = conn.execute("SELECT name, size, mtime_ns, event, scores, rows FROM files").fetchall()
+    except sqlite3.Error:
+        return None
+    try:
+        listing = folder_listing(folder)
+    except FileNotFoundError:
+        listing = None
+    if listing is not None and listing != {name: (size, mtime_ns) for name, size, mtime_ns, *_ in files}:
+        return None
+
+    season = SeasonScores()
+    for name, size, mtime_ns, event, scores, rows in files:
+        if scores is not None:
+            names, points = json.loads(scores)
+            season.add_file(name, StoredFileResult(event, names, array('i', points), rows))
+    season.flush()
+    return season
+
+class StoredFileResult(FileResult):
+    # A FileResult from a season store whose rows stay JSON text until they are
+    # first read, which a reload that only ranks associations never does
+    __slots__ = ("rows_json",)
+
+    def __init__(self, event, names, points, rows_json):
+        self.event = event
+        self.names = names
+        self.points = points
+        self.rows_json = rows_json
+
+    @property
+    def rows(self):
+        return [tuple(row) for row in json.loads(self.rows_json)]
+
+def load_season_stores(year_folders, timer=None, stop_event=None):
+    # Splits {year: folder} into ({year: SeasonScores} loaded from up-to-date
+    # stores, {year: folder} that still have to be scored). Once stop_event is
+    # set no more stores are opened.
+    start = time.perf_counter()
+    loaded = {}
+    for year, folder in year_folders.items():
+        if stop_event is not None and stop_event.is_set():
+            break
+        if not is_archive(folder):
+            season = load_season_store(folder)
+            if season is not None:
+                loaded[year] = season
+            elif not os.path.isdir(folder):
+                raise FileNotFoundError(f"{folder} is gone and {store_path_for(folder)} could not be loaded")
+    if timer is not None:
+        timer.add("store", time.perf_counter() - start, len(year_folders))
+    return loaded, {year: folder for year, folder in year_folders.items() if year not in loaded}
+
+def save_season_stores(year_folders, seasons, compile_seasons=False):
+    # Writes the store of each scored folder that was asked for, and rebuilds any
+    # store that was already there but out of date
+    for year, folder in year_folders.items():
+        if is_archive(folder):
+            continue
+        if compile_seasons or os.path.exists(store_path_for(folder)):
+            write_season_store(folder, seasons[year])
+
+def plan_seasons(year_folders, timer=None, max_in_flight=0, stop_event=None):
+    # Brings each season's manifest up to date. Returns ([(year, folder, finals)], total .lif files).
+    # Once stop_event is set the scan ends early and the plan is incomplete.
+    start = time.perf_counter()
+    manifests = {}
+    for year, folder in year_folders.items():
+        if stop_event is not None and stop_event.is_set():
+            break
+        manifests[year] = update_manifest(folder, max_in_flight, stop_event)
+    seasons = [(year, year_folders[year], manifest_finals(m)) for year, m in manifests.items()]
+    total_files = sum(len(m["files"]) for m in manifests.values())
+    if timer is not None:
+        timer.add("scan", time.perf_counter() - start, len(year_folders))
+        timer.files += total_files
+    return seasons, total_files
+
+def score_year_folders(year_folders, workers=1, use_cache=True, timer=None, compile_seasons=False,
+                       max_in_flight=0):
+    # {year: SeasonScores} for the given {year: folder}. Seasons with an up-to-date
+    # compiled store are loaded from it; compile_seasons writes stores for the rest.
+    # max_in_flight reads files concurrently (see iter_loaded).
+    loaded, to_score = load_season_stores(year_folders, timer)
+    seasons, total_files = plan_seasons(to_score, timer, max_in_flight)
+    year_seasons = {year: SeasonScores() for year in to_score}
+    merge_s = 0.0
+    merged = 0
+    with closing(score_seasons(seasons, workers, use_cache, timer, max_in_flight)) as results:
+        for year, f, file_scores in results:
+            if file_scores is not None:
+                start = time.perf_counter()
+                year_seasons[year].add_file(f, file_scores)
+                merge_s += time.perf_counter() - start
+                merged += 1
+    start = time.perf_counter()
+    for season in year_seasons.values():
+        season.flush()
+    merge_s += time.perf_counter() - start
+    save_season_stores(to_score, year_seasons, compile_seasons)
+    if timer is not None:
+        timer.add("merge", merge_s, merged)
+        log.info("Scoring timings\n%s", timer.summary())
+    year_seasons.update(loaded)
+    return {year: year_seasons[year] for year in year_folders}
+
+# Streaming aggregation. For all-history runs over very large folders or archives:
+# files are read one at a time (or max_in_flight at a time), scored straight into
+# the season's totals and let go, and nothing is kept per file or per row. Peak
+# memory is then the totals, one entry per association, plus the files being
+# read. Folders are listed with a scandir iterator and a tar is read as a stream
+# without keeping its member list; a zip still loads its central directory,
+# which is a small record per member.
+
+def score_lif_totals(data):
+    # (names, points) for a file's bytes without any result rows, or None if it
+    # is not a Final
+    header, lines = split_lif_bytes(data)
+    if "Final" not in header:
+        return None
+    return score_fields(iter_byte_fields(lines), table=POINTS_RULES.table_for(header))
+
+def read_final_bytes(f):
+    # A binary .lif file's bytes if its header line says Final, otherwise None
+    # with only the lines up to the header read, as read_header_bytes does
+    head = []
+    for chunk in iter(f.readline, b""):
+        head.append(chunk)
+        for line in chunk.splitlines():
+            header = line.decode("latin-1").strip()
+            if header:
+                return b"".join(head) + f.read() if "Final" in header else None
+    return None
+
+def read_final_path(filepath):
+    try:
+        with open(filepath, "rb") as f:
+            return read_final_bytes(f)
+    except FileNotFoundError:
+        return None
+
+def iter_season_bytes(path):
+    # For each .lif file of a season folder or archive, in listing order, its
+    # bytes if it is a Final or None if not
+    import tarfile
+    import zipfile
+    if archive_suffix(path) == ".zip":
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(".lif"):
+                    with zf.open(info) as f:
+                        yield read_final_bytes(f)
+        return
+    if is_archive(path):
+        with tarfile.open(path, "r|*") as tf:
+            while True:
+                member = tf.next()
+                if member is None:
+                    return
+                # A streamed TarFile otherwise keeps every TarInfo it has passed
+                tf.members = []
+                if member.isfile() and member.name.lower().endswith(".lif"):
+                    yield read_final_bytes(tf.extractfile(member))
+        return
+    for file_path in iter_scandir_paths(path):
+        yield read_final_path(file_path)
+
+def iter_scandir_paths(folder):
+    # .lif paths of a folder as the directory is read, without building a listing
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.name.lower().endswith(".lif") and entry.is_file():
+                yield entry.path
+
+def iter_bounded(items, load, max_in_flight):
+    # load(item) for each item, in order, on a thread pool with at most
+    # max_in_flight loads started and not yet consumed
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        window = deque()
+        for item in items:
+            window.append(executor.submit(load, item))
+            if len(window) >= max_in_flight:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+def stream_season_totals(path, max_in_flight=0, timer=None, registry=None):
+    # ScoreTotals for one season folder or archive. max_in_flight reads folder
+    # files that many at a time, e.g. on a network share; archives are read in order.
+    if timer is None:
+        timer = StageTimer()
+    totals = ScoreTotals(registry)
+    if max_in_flight > 1 and not is_archive(path):
+        files = iter_bounded(iter_scandir_paths(path), read_final_path, max_in_flight)
+    else:
+        files = iter_season_bytes(path)
+    while True:
+        start = time.perf_counter()
+        try:
+            data = next(files)
+        except StopIteration:
+            return totals
+        finally:
+            timer.add("read", time.perf_counter() - start)
+        timer.files += 1
+        if data is None:
+            continue
+        with timer.stage("parse"):
+            scored = score_lif_totals(data)
+        del data
+        if scored is not None:
+            names, points = scored
+            with timer.stage("merge"):
+                totals.add(totals.registry.intern_all(names), points)
+
+def stream_totals(year_folders, max_in_flight=0, timer=None):
+    # {year: ScoreTotals} for every season, one season and one file at a time
+    if timer is None:
+        timer = StageTimer()
+    year_scores = {year: stream_season_totals(path, max_in_flight, timer) for year, path in year_folders.items()}
+    log.info("Streaming timings\n%s", timer.summary())
+    return year_scores
+
+def ranking_for(scores):
+    # ScoreTotals keep their own Ranking; any other mapping is ranked once
+    if isinstance(scores, ScoreTotals):
+        return scores.ranking()
+    return Ranking(scores)
+
+def rank_scores(scores):
+    # [(rank, association, points)], highest points first, tied associations share a rank
+    return ranking_for(scores)[:]
+
+# Rows handed to csv.writer per call by the streaming exports
+EXPORT_CHUNK = 1000
+
+def write_chunked(csvfile, header, rows, progress=None):
+    # Streams rows to csvfile EXPORT_CHUNK at a time. progress(rows_written) is
+    # called after each chunk. Returns the number of rows written.
+    writer = csv.writer(csvfile)
+    writer.writerow(header)
+    rows = iter(rows)
+    written = 0
+    while True:
+        chunk = list(islice(rows, EXPORT_CHUNK))
+        if not chunk:
+            return written
+        writer.writerows(chunk)
+        written += len(chunk)
+        if progress is not None:
+            progress(written)
+
+def write_standings_csv(csvfile, scores, progress=None):
+    return write_chunked(csvfile, ["Rank", "Association", "Points"], ranking_for(scores), progress)
+
+CONTRIBUTION_HEADER = ["Rank", "Association", "Points", "Year", "File", "Event", "Place", "Race Points"]
+
+def iter_contributions(seasons, scores=None):
+    # One row per association per scoring result in {year: SeasonScores}, with the
+    # association's rank and points from scores, or from each season's own totals
+    ranking = ranking_for(scores) if scores is not None else None
+    for year, season in seasons.items():
+        season_ranking = ranking or season.total_scores.ranking()
+        for row in season.results:
+            if row.points is None:
+                continue
+            for club in row.associations():
+                yield (season_ranking.rank(club), club, season_ranking.points.get(club),
+                       year, row.file, row.event, row.place, row.points)
+
+def write_contributions_csv(csvfile, seasons, scores=None, progress=None):
+    return write_chunked(csvfile, CONTRIBUTION_HEADER, iter_contributions(seasons, scores), progress)
+
+def standings_changes(old_rows, new_rows):
+    # Rows of new_rows whose rank or points differ from old_rows, followed by
+    # (None, association, None) for associations that dropped out
+    old = {club: (rank, points) for rank, club, points in old_rows}
+    changes = [(rank, club, points) for rank, club, points in new_rows if old.get(club) != (rank, points)]
+    current = {club for rank, club, points in new_rows}
+    changes += [(None, club, None) for club in old if club not in current]
+    return changes
+
+CHANGE_LOG_HEADER = ["Association", "Old Rank", "New Rank", "Old Points", "New Points"]
+
+def rescore_file(season, folder, name):
+    # Re-reads one amended file of a season folder (e.g. re-exported after a
+    # protest) and swaps its contribution into season. Returns the change log
+    # from SeasonScores.amend_file. Only that file is read; the manifest catches
+    # up on the next scan of the folder.
+    path = os.path.join(folder, name)
+    file_scores = score_lif_path(path) if os.path.isfile(path) else None
+    return season.amend_file(name, file_scores)
+
+# Live watching of a year folder
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+
+def open_inotify(folder):
+    # Returns an inotify file descriptor watching folder, or None where inotify
+    # is not available (other platforms, or a libc without it)
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+    if libc.inotify_add_watch(fd, os.fsencode(folder), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+def snapshot_folder(folder):
+    snapshot = {}
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.name.lower().endswith(".lif") and entry.is_file():
+                st = entry.stat()
+                snapshot[entry.name] = (st.st_size, st.st_mtime_ns)
+    return snapshot
+
+class FolderWatcher:
+    # Reports .lif files that were added, changed or removed in a folder. Uses
+    # inotify where available and falls back to polling (size, mtime), which is
+    # also what network shares need since they don't deliver inotify events.
+    def __init__(self, folder, use_inotify=True):
+        self.folder = folder
+        self.fd = open_inotify(folder) if use_inotify else None
+        self.snapshot = snapshot_folder(folder) if self.fd is None else None
+
+    def changes(self, timeout=1.0):
+        if self.fd is None:
+            time.sleep(timeout)
+            snapshot = snapshot_folder(self.folder)
+            names = {name for name in snapshot.keys() | self.snapshot.keys()
+                     if snapshot.get(name) != self.snapshot.get(name)}
+            self.snapshot = snapshot
+            return names
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return set()
+
+        names = set()
+        offset = 0
+        while offset + 16 <= len(data):
+            wd, mask, cookie, length = struct.unpack_from("iIII", data, offset)
+            offset += 16
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if name.lower().endswith(".lif"):
+                names.add(name)
+        return names
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+def iter_folder_changes(folder, stop_event=None, timeout=1.0, use_inotify=True):
+    # Yields batches of (filename, file_scores) for .lif files that changed;
+    # file_scores is None for files that were removed or are not Finals
+    watcher = FolderWatcher(folder, use_inotify)
+    try:
+        while stop_event is None or not stop_event.is_set():
+            names = watcher.changes(timeout)
+            if not names:
+                continue
+            manifest = update_manifest(folder)
+            batch = []
+            for name in sorted(names):
+                info = manifest["files"].get(name)
+                if info is not None and info["type"] == "Final":
+                    batch.append((name, score_lif_path(os.path.join(folder, name))))
+                else:
+                    batch.append((name, None))
+            yield batch
+    finally:
+        watcher.close()
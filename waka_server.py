@@ -0,0 +1,292 @@
+# Standings over HTTP for the screens around the venue and club managers' phones.
+# Serves JSON straight from the scored seasons held in memory, using only the
+# standard library:
+#
+#   GET /years               {"years": [2019, 2020]}
+#   GET /standings           all-time table (the one season if only one is loaded)
+#   GET /standings/2020      one season's table
+#   GET /clubs/<association> an association's rank, points and races per season
+#   GET /events              Server-Sent Events: a diff every time standings change
+#
+# Every response carries an ETag. A client that sends it back in If-None-Match
+# gets an empty 304 until the table it asked for actually changes, so polling
+# every few seconds costs almost nothing. Bodies are encoded once per change and
+# shared by every request until the next publish().
+#
+# /events streams each change as a compact diff, {"year": "2024", "changes":
+# [[association, rank, points], ...]} with rank and points null for an
+# association that dropped out. A browser's EventSource reconnects on its own
+# and resumes from the last diff it saw.
+import json
+import queue
+import hashlib
+import threading
+from collections import deque
+from urllib.parse import urlsplit, unquote
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from waka_scoring import combine_scores, ranking_for, log
+
+def standings_rows(scores):
+    return [{"rank": rank, "association": club, "points": points} for rank, club, points in ranking_for(scores)]
+
+def club_breakdown(seasons, club):
+    # None if the association has no points in any loaded season
+    breakdown = {}
+    for year in sorted(seasons):
+        season = seasons[year]
+        points = season.total_scores.get(club)
+        if points is None:
+            continue
+        breakdown[str(year)] = {
+            "rank": season.total_scores.ranking().rank(club),
+            "points": points,
+            "races": [
+                {"file": row.file, "event": row.event, "place": row.place, "points": row.points}
+                for row in season.results.club_results(club)
+            ]
+        }
+    if not breakdown:
+        return None
+    return {
+        "association": club,
+        "points": sum(season["points"] for season in breakdown.values()),
+        "seasons": breakdown
+    }
+
+def standings_diff(year, scores, clubs):
+    # The diff pushed to /events subscribers for the associations in clubs
+    ranking = scores.ranking()
+    return {"year": str(year), "changes": [[club, ranking.rank(club), scores.get(club)] for club in sorted(clubs)]}
+
+# Most a reconnecting subscriber is sent to catch up; a socket's send buffer
+# takes this much without blocking
+REPLAY_LIMIT = 32 * 1024
+
+def sse_frame(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode("utf-8")
+
+class Broadcaster:
+    # Fans diffs out to every /events subscriber from one thread. Each diff is
+    # encoded into an SSE frame once and the same bytes are written to every
+    # socket. Sockets are non-blocking: a subscriber that can't take a whole
+    # frame straight away is dropped rather than holding up the rest, and
+    # catches up from the backlog when it reconnects with Last-Event-ID.
+    def __init__(self, backlog=256, keepalive=15.0):
+        self.queue = queue.Queue()
+        self.frames = deque(maxlen=backlog)
+        self.last_id = 0
+        self.streams = set()
+        self.keepalive = keepalive
+        self.thread = threading.Thread(target=self.run, daemon=True, name="standings-broadcaster")
+        self.thread.start()
+
+    def send(self, diff):
+        self.queue.put(("diff", diff))
+
+    def subscribe(self, sock, last_id=None):
+        # Takes over an open connection whose response headers have been sent
+        self.streams.add(sock)
+        self.queue.put(("subscribe", sock, last_id))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        subscribers = []
+        while True:
+            try:
+                item = self.queue.get(timeout=self.keepalive)
+            except queue.Empty:
+                subscribers = self.write_all(subscribers, b": keepalive\n\n")
+                continue
+            if item is None:
+                break
+            if item[0] == "diff":
+                self.last_id += 1
+                frame = sse_frame(self.last_id, "standings", json.dumps(item[1], ensure_ascii=False,
+                                                                        separators=(",", ":")))
+                self.frames.append((self.last_id, frame))
+                subscribers = self.write_all(subscribers, frame)
+            else:
+                _, sock, last_id = item
+                sock.setblocking(False)
+                if self.replay(sock, last_id):
+                    subscribers.append(sock)
+        for sock in subscribers:
+            self.drop(sock)
+
+    def replay(self, sock, last_id):
+        # Frames the subscriber missed, or a reset telling it to re-fetch
+        # /standings when they have left the backlog, are too many to send
+        # without blocking, or come from before a server restart
+        if last_id is None or last_id == self.last_id:
+            return self.write(sock, b"retry: 2000\n\n")
+        missed = b""
+        oldest = self.frames[0][0] if self.frames else self.last_id + 1
+        if oldest - 1 <= last_id < self.last_id:
+            missed = b"".join(frame for event_id, frame in self.frames if event_id > last_id)
+        if not missed or len(missed) > REPLAY_LIMIT:
+            missed = sse_frame(self.last_id, "reset", "{}")
+        return self.write(sock, missed)
+
+    def write_all(self, subscribers, data):
+        return [sock for sock in subscribers if self.write(sock, data)]
+
+    def write(self, sock, data):
+        try:
+            if sock.send(data) == len(data):
+                return True
+        except OSError:
+            pass
+        self.drop(sock)
+        return False
+
+    def drop(self, sock):
+        self.streams.discard(sock)
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+class StandingsServer(ThreadingHTTPServer):
+    # HTTP server whose requests run on a fixed pool of threads. seasons is the
+    # {year: SeasonScores} being served. Tables are rendered from it holding lock,
+    # so change it only while holding lock too, then call publish() so the next
+    # request re-renders instead of serving the cached bodies, passing the
+    # standings_diff for /events subscribers.
+    daemon_threads = True
+    # Hundreds of polling clients connect at once; the default backlog of 5
+    # drops their SYNs and they stall for seconds on TCP retries
+    request_queue_size = 1024
+
+    def __init__(self, address, seasons, threads=32):
+        super().__init__(address, StandingsHandler)
+        self.seasons = seasons
+        self.version = 0
+        self.bodies = {}
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="standings")
+        self.broadcaster = Broadcaster()
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def shutdown_request(self, request):
+        # /events connections now belong to the broadcaster
+        if request not in self.broadcaster.streams:
+            super().shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+        self.broadcaster.close()
+
+    def publish(self, seasons=None, diff=None):
+        with self.lock:
+            if seasons is not None:
+                self.seasons = seasons
+            self.version += 1
+        if diff is not None and diff["changes"]:
+            self.broadcaster.send(diff)
+
+    def render(self, path):
+        # The JSON-able data for a path, or None if there is no such resource
+        seasons = self.seasons
+        # Split before unquoting so an association name may contain "/" (%2F)
+        parts = [unquote(part) for part in path.split("/", 1)]
+        if parts in ([""], ["years"]):
+            return {"years": sorted(seasons)}
+        if parts == ["standings"]:
+            if len(seasons) == 1:
+                year, season = next(iter(seasons.items()))
+                return {"year": str(year), "standings": standings_rows(season.total_scores)}
+            scores = combine_scores(season.total_scores for season in seasons.values())
+            return {"year": "all", "standings": standings_rows(scores)}
+        if len(parts) == 2 and parts[0] == "standings" and parts[1].isdigit() and int(parts[1]) in seasons:
+            return {"year": parts[1], "standings": standings_rows(seasons[int(parts[1])].total_scores)}
+        if len(parts) == 2 and parts[0] == "clubs":
+            return club_breakdown(seasons, parts[1])
+        return None
+
+    def body_for(self, path):
+        # (body, etag) for a path, or None. A body is rendered at most once per
+        # publish; the ETag is a hash of the body, so a table the change didn't
+        # touch keeps its ETag and its clients keep getting 304s.
+        path = path.strip("/")
+        with self.lock:
+            cached = self.bodies.get(path)
+            if cached is not None and cached[0] == self.version:
+                return cached[1:]
+            data = self.render(path)
+            if data is None:
+                return None
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            if cached is not None and cached[1] == body:
+                etag = cached[2]
+            else:
+                etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+            self.bodies[path] = (self.version, body, etag)
+            return body, etag
+
+class StandingsHandler(BaseHTTPRequestHandler):
+    server_version = "WakaStandings/1.0"
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        path = urlsplit(self.path).path
+        if path.strip("/") == "events" and send_body:
+            self.subscribe()
+            return
+        found = self.server.body_for(path)
+        if found is None:
+            self.send_error(404, "No such table or association")
+            return
+        body, etag = found
+        matches = [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]
+        if etag in matches or "*" in matches:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def subscribe(self):
+        last_id = self.headers.get("Last-Event-ID", "")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.close_connection = True
+        self.server.broadcaster.subscribe(self.connection, int(last_id) if last_id.isdigit() else None)
+
+    def log_message(self, format, *args):
+        log.debug("%s - %s", self.address_string(), format % args)
+
+def parse_address(text):
+    # "8000", ":8000" or "0.0.0.0:8000" -> (host, port); host defaults to all interfaces
+    host, _, port = text.rpartition(":")
+    return host or "0.0.0.0", int(port)
+
+def start_server(seasons, address=("0.0.0.0", 8000), threads=32):
+    # Starts serving on a background thread and returns the server
+    server = StandingsServer(address, seasons, threads)
+    threading.Thread(target=server.serve_forever, daemon=True, name="standings-server").start()
+    log.info("Serving standings on http://%s:%d/", *server.server_address[:2])
+    return server